@@ -1,5 +1,8 @@
 # Display scatter plot of area, texture and aspect ratio
 # Tom Zimmerman, IBM Research 26 Sept 2020
+# V3 Oct 18, 2026 START_FRAME and j/l jumps reach the exact frame (FrameSource exact=True), so features match the frame shown
+# V2 Oct 18, 2026 objects of each frame found with a frame index, playback can pause, change speed and jump
+# Video keys: q quit, space pause, + faster, - slower, j back JUMP frames, l forward JUMP frames
 #
 # This work is funded by the National Science Foundation (NSF) grant No. DBI-1548297, Center for Cellular Construction.
 # Disclaimer:  Any opinions, findings and conclusions or recommendations expressed in this material are those of the authors and do not necessarily reflect the views of the National Science Foundation.
@@ -9,11 +12,16 @@ import numpy as np
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
 import cv2
+import FrameSource as FS # threaded video reader
+import ObjectFile as OF # reads binary object files and CSV
 import clusterConstants as C # constants used by all programs
 ########## USER SETTINGS ##############################
 PLANKTON='blep_1'
 VID=r'blep1.mp4'
 CLASS_FILE=r'blep_1_class.csv'
+START_FRAME=0   # first frame shown
+DELAY=100       # msec between frames, + and - keys change it
+JUMP=100        # frames skipped by the j and l keys
 
 # make colors for displaying class
 colorTable = [[0,0,255],[255,0,0],[0,255,255],[75,0,130],[0,255,0],[0,0,0]]
@@ -36,27 +44,34 @@ def plotCluster():
 def showVideo(VID):
     status=0        # return status, 1=good (found and processed video)
     # display video using bounding box color to indicate predicted class
-    cap = cv2.VideoCapture(VID)
+    frameIndex=OF.getFrameIndex(CLASS_FILE,C.FRAME)   # rows of each frame
+    cap = FS.FrameSource(VID,START_FRAME,exact=True) # decodes next frames while this one is displayed, exact: a seek can land on another frame
     print('vid open',cap.isOpened())
-    frameCount=0; oi=0;             # object index
-    eof=False                       # end of file indicator
-    while(cap.isOpened() and eof==False):
+    delay=DELAY
+    while(cap.isOpened()):
         ret, frameIM = cap.read()   # get image
         if not ret:                 # check to make sure there was a frame to read
             break
+        frameCount=cap.frameIndex
         vgaIM = cv2.resize(frameIM,(C.X_REZ, C.Y_REZ))
-        while (f[oi,C.FRAME]==frameCount and eof==False):
-            x0=int(f[oi,C.X0]); y0=int(f[oi,C.Y0]); x1=int(f[oi,C.X1]); y1=int(f[oi,C.Y1]); 
-            colorIndex=int(f[oi,C.PREDICT_CLASS])
+        for obj in f[frameIndex.rows(frameCount)]:  # objects of this frame, none if nothing was detected
+            x0=int(obj[C.X0]); y0=int(obj[C.Y0]); x1=int(obj[C.X1]); y1=int(obj[C.Y1]); 
+            colorIndex=int(obj[C.PREDICT_CLASS])
             cv2.rectangle(vgaIM, (x0,y0), (x1,y1), colorTable[colorIndex], 3) # place rectangle around each object, color indicate predicted class
-            if oi==len(f)-1: # quit when reached last row
-                eof=True
-            else:
-                oi+=1
         cv2.imshow('vgaIM', vgaIM)# display thresh image
-        key=cv2.waitKey(100) & 0xFF # pause x msec
-        frameCount+=1
+        key=cv2.waitKey(delay) & 0xFF # pause x msec
         status=1            # indicate that reading frames successfully
+        if key==ord('q'):
+            break
+        elif key==ord(' '):
+            cv2.waitKey(0)  # pause until a key is pressed
+        elif key==ord('+'):
+            delay=max(1,delay//2)
+        elif key==ord('-'):
+            delay=delay*2
+        elif key==ord('j') or key==ord('l'):
+            cap.release()
+            cap=FS.FrameSource(VID,max(0,frameCount+(JUMP if key==ord('l') else -JUMP)),exact=True)  # grabs from the start, slower than a seek on long videos but the frame matches its features
     cap.release()
     cv2.destroyAllWindows()
     return(status)
@@ -64,7 +79,7 @@ def showVideo(VID):
     
 ################ Main ################
 np.random.seed(5)
-f=np.loadtxt(CLASS_FILE,skiprows=1,delimiter=',')
+f=OF.load(CLASS_FILE)
 print('Loaded',CLASS_FILE)
 plotCluster()
 status=showVideo(VID)
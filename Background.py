@@ -0,0 +1,87 @@
+# Background estimation for video, updated frame by frame as the video is read
+# V2 10.18.26 getState/setState so a checkpoint can restore the model
+# V1 10.18.26
+#
+# Replaces the median of randomly seeked frames (each seek decodes from the last keyframe)
+# with models that are fed frames in reading order and use bounded memory:
+#   'approxMedian' each pixel steps toward the frame by STEP gray levels, converges to the median
+#   'ema'          exponential moving average, cv2.accumulateWeighted with rate ALPHA
+#   'window'       median of the last WINDOW sampled frames held in a ring buffer
+#
+# Thomas Zimmerman IBM Research-Almaden, Center for Cellular Construction (https://ccc.ucsf.edu/) 
+# This work is funded by the National Science Foundation (NSF) grant No. DBI-1548297 
+# Disclaimer:  Any opinions, findings and conclusions or recommendations expressed in this material are those of the authors and do not necessarily reflect the views of the National Science Foundation.
+
+import numpy as np
+import cv2
+
+MODE='window'   # 'approxMedian', 'ema' or 'window'
+WINDOW=20       # frames held by the window median
+EVERY=10        # window mode samples a frame and recomputes the median every EVERY updates
+ALPHA=0.02      # ema learning rate
+STEP=1          # approxMedian step in gray levels per frame
+WARM_UP=20      # frames read at the start of a video to initialize the background
+WARM_UP_SKIP=10 # frames skipped (grab, no seek) between warm up frames
+
+class BackgroundModel:
+    def __init__(self, mode=MODE, window=WINDOW, every=EVERY, alpha=ALPHA, step=STEP):
+        if mode not in ('approxMedian','ema','window'):
+            raise ValueError('unknown background mode '+str(mode))
+        self.mode=mode; self.window=window; self.every=max(1,every); self.alpha=alpha; self.step=step
+        self.count=0            # number of frames used to update the model
+        self.bkgIM=None         # current background, uint8
+        self.accIM=None         # float background used by ema
+        self.ring=None          # window mode frame buffer (window,rows,cols)
+        self.ringCount=0        # number of frames stored in ring
+
+    def update(self, grayIM):
+        # add a gray frame to the model, returns the current background
+        if self.bkgIM is None:
+            self.bkgIM=grayIM.copy()
+            self.accIM=grayIM.astype('float32')
+            if self.mode=='window':
+                self.ring=np.empty((self.window,)+grayIM.shape,dtype='uint8')
+        if self.mode=='approxMedian':
+            self.bkgIM=cv2.add(self.bkgIM,cv2.compare(grayIM,self.bkgIM,cv2.CMP_GT)//255*self.step) # step up where frame is brighter
+            self.bkgIM=cv2.subtract(self.bkgIM,cv2.compare(grayIM,self.bkgIM,cv2.CMP_LT)//255*self.step) # step down where frame is darker
+        elif self.mode=='ema':
+            cv2.accumulateWeighted(grayIM,self.accIM,self.alpha)
+            self.bkgIM=cv2.convertScaleAbs(self.accIM)
+        elif self.ringCount<self.window or self.count%self.every==0:
+            # fill the window with every frame at start, then sample every EVERY frames
+            self.ring[self.ringCount%self.window]=grayIM
+            self.ringCount+=1
+            self.bkgIM=np.median(self.ring[:min(self.ringCount,self.window)],axis=0).astype('uint8')
+        self.count+=1
+        return(self.bkgIM)
+
+    def get(self):
+        return(self.bkgIM)
+
+    STATE=('count','bkgIM','accIM','ring','ringCount')
+
+    def getState(self):
+        # copy of everything update() changes, {name:value}, arrays not yet created are left out
+        return({name:np.copy(getattr(self,name)) for name in self.STATE if getattr(self,name) is not None})
+
+    def setState(self, state):
+        for name in self.STATE:
+            if name in state:
+                value=np.copy(state[name])
+                setattr(self,name,value if value.ndim else value.item())
+
+def warmUp(cap, model, frames=WARM_UP, skip=WARM_UP_SKIP):
+    # initialize model by reading frames in order, grab() skips frames without converting them
+    for i in range(frames):
+        for s in range(skip):
+            cap.grab()
+        ret, colorIM = cap.read()
+        if not ret:
+            break
+        model.update(cv2.cvtColor(colorIM, cv2.COLOR_BGR2GRAY))
+    return(model.get())
+
+def flatten(grayIM, bkgIM):
+    # remove background, keeps the average background level so detection thresholds keep their meaning
+    flatIM=grayIM.astype('int16')-bkgIM.astype('int16')+int(bkgIM.mean())
+    return(np.clip(flatIM,0,255).astype('uint8'))
@@ -0,0 +1,164 @@
+# BATCH
+# Detect, track and extract features of many videos without a display, one object file per video plus a run manifest
+# V4 18 Oct 2026 object files are binary (ObjectFile, .cols) unless --format csv
+# V3 18 Oct 2026 object files are written frame by frame (ObjectWriter), memory doesn't grow with video length
+# V2 18 Oct 2026 --resume continues videos from their checkpoint (with CHECKPOINT_EVERY>0)
+# V1 18 Oct 2026
+#
+# examples:
+#   python Batch.py videos/*.mp4 -o objects
+#   python Batch.py videos -o objects -j 4 --set THRESH=90 --set "FEATURE_GROUPS=('shape','hist')"
+#   python Batch.py videos -o objects --config settings.json     (JSON object of Common names and values)
+# Common parameters are given as NAME=VALUE, VALUE is a python literal (numbers, strings, tuples) or else a string.
+# DEBUG is always 0. With -j >1 each video runs in its own process and Common.WORKERS is set to 0.
+# With --set CHECKPOINT_EVERY=N each video saves a checkpoint next to its object file every N frames, run again with
+# --resume after a crash to continue from them.
+#
+# Thomas Zimmerman IBM Research-Almaden, Center for Cellular Construction (https://ccc.ucsf.edu/)
+# This work is funded by the National Science Foundation (NSF) grant No. DBI-1548297
+# Disclaimer:  Any opinions, findings and conclusions or recommendations expressed in this material are those of the authors and do not necessarily reflect the views of the National Science Foundation.
+
+import argparse
+import ast
+import glob
+import json
+import shutil
+import os
+import sys
+import time
+import traceback
+import multiprocessing as mp
+import Common as C
+import Detect as D
+import Checkpoint as CK
+import ObjectFile as OF
+
+VIDEO_EXTENSIONS=('.mp4','.avi','.mov','.mkv','.h264')    # videos picked up from a directory
+MANIFEST_FILE_NAME='manifest.json'
+
+def parseValue(text):
+    try:
+        return(ast.literal_eval(text))
+    except (ValueError,SyntaxError):
+        return(text)
+
+def getSettings(setList,configFile=None):
+    # Common overrides from a JSON config file then --set NAME=VALUE flags, returns {name:value}
+    settings={}
+    if configFile is not None:
+        with open(configFile) as f:
+            config=json.load(f)
+        for name,value in config.items():
+            settings[name]=tuple(value) if isinstance(value,list) else value # lists in JSON are tuples in Common
+    for item in setList:
+        if '=' not in item:
+            raise ValueError('--set needs NAME=VALUE, got '+item)
+        (name,value)=item.split('=',1)
+        settings[name.strip()]=parseValue(value.strip())
+    for name in settings:
+        if not name.isupper() or not hasattr(C,name):
+            raise ValueError('unknown Common parameter '+name)
+    settings['DEBUG']=0     # no windows or waitKey
+    return(settings)
+
+def findVideos(paths):
+    # expands globs (Windows shells don't) and directories into a sorted list of video files
+    videos=[]
+    for path in paths:
+        if os.path.isdir(path):
+            videos+=[os.path.join(path,name) for name in os.listdir(path) if name.lower().endswith(VIDEO_EXTENSIONS)]
+        elif glob.has_magic(path):
+            videos+=glob.glob(path)
+        else:
+            videos.append(path)
+    return(sorted(set(videos)))
+
+FORMATS={'cols':OF.SUFFIX,'csv':'.csv'}  # --format -> object file name ending
+
+def objectFileName(vid,outDir,suffix=OF.SUFFIX):
+    return(os.path.join(outDir,os.path.splitext(os.path.basename(vid))[0]+suffix))
+
+def processVideo(vid,outDir,resume=False,suffix=OF.SUFFIX):
+    # detect, track and extract features of one video and save its object file, returns its manifest entry
+    entry={'video':vid,'objectFile':objectFileName(vid,outDir,suffix),'status':0,'objects':0,'seconds':0.0,'error':None}
+    checkpointFile=entry['objectFile']+'.checkpoint.npz'
+    startTime=time.time()
+    try:
+        (status,entry['objects'])=D.detectTrackFeature(vid,checkpointFile,resume,entry['objectFile'])
+        entry['status']=status
+        if status:
+            CK.remove(checkpointFile)
+        else:
+            entry['error']='no frames read'
+            if os.path.isdir(entry['objectFile']):  # only the header was written
+                shutil.rmtree(entry['objectFile'])
+            else:
+                os.remove(entry['objectFile'])
+    except Exception:
+        entry['error']=traceback.format_exc().strip().split('\n')[-1]
+    entry['seconds']=round(time.time()-startTime,3)
+    return(entry)
+
+def processVideoArgs(args):
+    return(processVideo(*args))
+
+def runBatch(videos,outDir,settings,jobs=1,resume=False,suffix=OF.SUFFIX):
+    # process every video with Common overridden by settings, writes outDir/MANIFEST_FILE_NAME and returns the manifest
+    os.makedirs(outDir,exist_ok=True)
+    names=[objectFileName(vid,outDir,suffix) for vid in videos]
+    if len(set(names))<len(names):
+        raise ValueError('videos with the same name would write the same object file, use one output directory per folder')
+    if jobs>1:
+        settings=dict(settings,WORKERS=0)   # pool workers can't start their own pools
+    D.initWorker(settings)
+    manifest={'started':time.strftime('%Y-%m-%d %H:%M:%S'),'outDir':outDir,'jobs':jobs,'overrides':settings,
+              'settings':{name:value for name,value in D.commonSettings().items() if isinstance(value,(int,float,str,tuple,list))},
+              'videos':[]}
+    startTime=time.time()
+    if jobs>1:
+        pool=mp.Pool(jobs,D.initWorker,(D.commonSettings(),))
+        try:
+            results=pool.imap_unordered(processVideoArgs,[(vid,outDir,resume,suffix) for vid in videos])
+            for entry in results:
+                manifest['videos'].append(entry)
+                print('Finished',len(manifest['videos']),'of',len(videos),entry['video'],entry['objects'],'objects',entry['error'] or '')
+        finally:
+            pool.terminate()
+    else:
+        for vid in videos:
+            entry=processVideo(vid,outDir,resume,suffix)
+            manifest['videos'].append(entry)
+            print('Finished',len(manifest['videos']),'of',len(videos),entry['video'],entry['objects'],'objects',entry['error'] or '')
+    manifest['videos'].sort(key=lambda entry:entry['video'])
+    manifest['seconds']=round(time.time()-startTime,3)
+    with open(os.path.join(outDir,MANIFEST_FILE_NAME),'w') as f:
+        json.dump(manifest,f,indent=1,default=str)
+    return(manifest)
+
+def main(argv=None):
+    parser=argparse.ArgumentParser(description='Detect, track and extract features of many videos without a display')
+    parser.add_argument('videos',nargs='+',help='video files, globs or directories')
+    parser.add_argument('-o','--out',default='.',help='directory for object files and '+MANIFEST_FILE_NAME)
+    parser.add_argument('-j','--jobs',type=int,default=1,help='videos processed at the same time (processes)')
+    parser.add_argument('--set',action='append',default=[],metavar='NAME=VALUE',help='override a Common parameter, can repeat')
+    parser.add_argument('--config',help='JSON file of Common parameters, --set wins')
+    parser.add_argument('--format',choices=FORMATS,default='cols',help='object file format, cols (binary, ObjectFile.py) or csv')
+    parser.add_argument('--resume',action='store_true',help='continue videos from their checkpoints (needs CHECKPOINT_EVERY>0)')
+    args=parser.parse_args(argv)
+    try:
+        settings=getSettings(args.set,args.config)
+    except ValueError as e:
+        parser.error(str(e))
+    videos=findVideos(args.videos)
+    if len(videos)==0:
+        parser.error('no videos found')
+    try:
+        manifest=runBatch(videos,args.out,settings,args.jobs,args.resume,FORMATS[args.format])
+    except ValueError as e:
+        parser.error(str(e))
+    failed=[entry for entry in manifest['videos'] if entry['error'] is not None]
+    print('Processed',len(videos)-len(failed),'of',len(videos),'videos in',manifest['seconds'],'seconds')
+    return(1 if failed else 0)
+
+if __name__=='__main__':
+    sys.exit(main())
@@ -0,0 +1,74 @@
+# CHECKPOINT
+# Saves the state of Detect.detectTrackFeature every C.CHECKPOINT_EVERY frames so a long run can resume after a crash
+# V1 18 Oct 2026
+#
+# A checkpoint is two files:
+#   fileName         npz with the objects of the last frame (the tracker matches against them), Track.nextID,
+#                    next frame to read, background model and the Common settings of the run
+#   fileName.rows    every object row before the last frame, raw float64 with C.MAX_OBJ_COL columns. Rows are
+#                    appended, so saving a checkpoint only writes the rows added since the last one, and they no
+#                    longer need to be kept in memory
+# The npz is written to a temporary file and renamed, so a crash while saving leaves the previous checkpoint,
+# and rows appended after it are cut off on load.
+#
+# Thomas Zimmerman IBM Research-Almaden, Center for Cellular Construction (https://ccc.ucsf.edu/)
+# This work is funded by the National Science Foundation (NSF) grant No. DBI-1548297
+# Disclaimer:  Any opinions, findings and conclusions or recommendations expressed in this material are those of the authors and do not necessarily reflect the views of the National Science Foundation.
+
+import os
+import json
+import numpy as np
+import Common as C
+
+BKG_PREFIX='bkg_'   # npz keys of the background model state
+
+def settingsText():
+    # Common settings that change the output, a resumed run must use the same ones
+    ignore=('DEBUG','WORKERS','WORKER_QUEUE','PROFILE','PROFILE_FILE','CHECKPOINT_EVERY')
+    settings={name:value for name,value in vars(C).items() if name.isupper() and name not in ignore}
+    return(json.dumps(settings,sort_keys=True,default=str))
+
+def rowsFileName(fileName):
+    return(fileName+'.rows')
+
+def save(fileName,state,newRows,bkgState=None):
+    # appends newRows to the rows file, then saves state (dict of numbers and arrays) with the number of rows saved
+    with open(rowsFileName(fileName),'ab') as f:
+        f.write(np.ascontiguousarray(newRows,dtype='float').tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    state=dict(state,flushed=os.path.getsize(rowsFileName(fileName))//(8*C.MAX_OBJ_COL),settings=settingsText())
+    if bkgState is not None:
+        for name,value in bkgState.items():
+            state[BKG_PREFIX+name]=value
+    tempName=fileName+'.tmp'
+    with open(tempName,'wb') as f:
+        np.savez(f,**state)
+    os.replace(tempName,fileName)
+
+def exists(fileName):
+    return(fileName is not None and os.path.exists(fileName))
+
+def load(fileName):
+    # returns (state,bkgState) of the last checkpoint, raises ValueError if it was made with different Common settings
+    with np.load(fileName) as data:
+        state={name:data[name] for name in data.files}
+    if str(state.pop('settings'))!=settingsText():
+        raise ValueError('checkpoint '+fileName+' was made with different Common settings')
+    bkgState={name[len(BKG_PREFIX):]:value for name,value in state.items() if name.startswith(BKG_PREFIX)}
+    state={name:(value.item() if value.ndim==0 else value) for name,value in state.items() if not name.startswith(BKG_PREFIX)}
+    with open(rowsFileName(fileName),'r+b') as f:
+        f.truncate(state['flushed']*8*C.MAX_OBJ_COL)    # rows written after the checkpoint are done again
+    return(state,bkgState)
+
+def loadRows(fileName):
+    # every row saved in the rows file
+    if not os.path.exists(rowsFileName(fileName)):
+        return(np.zeros((0,C.MAX_OBJ_COL)))
+    return(np.fromfile(rowsFileName(fileName),dtype='float').reshape(-1,C.MAX_OBJ_COL))
+
+def remove(fileName):
+    # delete a checkpoint once the object file has been written
+    for name in (fileName,rowsFileName(fileName),fileName+'.tmp'):
+        if os.path.exists(name):
+            os.remove(name)
@@ -1,6 +1,7 @@
 # Clustering using K-Means
 # See https://scikit-learn.org/stable/modules/generated/sklearn.cluster.KMeans.html#sklearn.cluster.KMeans.get_params
 #
+# V6 Oct 18, 2026 feature and cluster files can be binary object files (ObjectFile, .cols) or CSV
 # V5 Oct 5, 2020 Consolidated code into one program
 #
 # Tom Zimmerman, IBM Research
@@ -8,11 +9,12 @@
 
 from sklearn.cluster import KMeans
 import numpy as np
+import ObjectFile as OF # reads binary object files and CSV
 
 ################ USER SETTINGS #####################
 VID_NAME=r'C:\Code\A_PINC_SFSU\blep1.mp4'       # video to be displayed
 FEATURE_FILE_NAME=r'featureFile_2.csv'          # feature file input
-CLUSTER_FILE_NAME=r'clusterFile_2.csv'          # cluster file output (feature file with objID replaced with clusterID 
+CLUSTER_FILE_NAME=r'clusterFile_2.csv'          # cluster file output (feature file with objID replaced with clusterID), name ending with .cols saves a binary object file
 CLUSTERS=5# how many clusters to create
 
 ############# CONSTANTS and VARIABLES ###################
@@ -36,7 +38,7 @@ def doCluster(XT):
 
 ####################### MAIN ########################
 # load feature file
-featureFile=np.loadtxt(FEATURE_FILE_NAME,skiprows=1,delimiter=',')
+featureFile=OF.load(FEATURE_FILE_NAME)
 print('Loaded',FEATURE_FILE_NAME,'Shape',featureFile.shape)
 
 # Cluster and put cluster group into obj file as predicted class
@@ -47,7 +49,7 @@ XT=featureFile[:,AREA:]
 featureFile[:,CLUSTER]=predict[:] # assign cluster to predicted class
 
 # Save cluster file
-np.savetxt(CLUSTER_FILE_NAME,featureFile,header=clusterHeader,fmt='%f',delimiter=',') # saves numpy array as a csv file    
+OF.save(CLUSTER_FILE_NAME,featureFile,clusterHeader) # saves numpy array as a csv or object file    
 print('saved cluster file',CLUSTER_FILE_NAME)
 
 
@@ -14,6 +14,11 @@ MAX_FRAME=0             # number of frames to process, if equal to zero, read al
 DEBUG=1                 # shows detection and tracking frame-by-frame (but slows down processing)
 X_REZ_DEBUG=640; Y_REZ_DEBUG=480;  # debug display
 THICK=3                 # ROI box line thickness
+WORKERS=0               # >1 detects and extracts features of frames in this many processes (on Windows call from under if __name__=='__main__':)
+WORKER_QUEUE=2          # frames in flight per worker, bounds memory when decoding is faster than detection
+PROFILE=0               # 1 prints time spent in each stage at the end of a video (Profile.py), 2 also writes every stage call to PROFILE_FILE
+CHECKPOINT_EVERY=0      # frames between checkpoints when detectTrackFeature is given a checkpoint file (Checkpoint.py), 0=off
+PROFILE_FILE='profile.json' # stage trace, .json opens in chrome://tracing or https://ui.perfetto.dev, .csv one row per call
 
 # Detector 
 THRESH=100
@@ -23,23 +28,40 @@ MAX_AREA=15000
 ENLARGE=10              # increase ROI to include all of obj, also used to detect if near boarder or other objects in ROI window
 MULTI_OBJECT_REJECT=0   # 1=reject obj with multiple objects in ROI
 MIN_OBJ_LEN=100         # file must have at least this many objets else it is not processed
+BACKGROUND=0            # 1=subtract a streaming background model (Background.py) before threshold, for uneven illumination
+BACKGROUND_MODE='window' # background model, 'approxMedian', 'ema' or 'window'
+DETECTOR='threshold'    # 'threshold' finds dark objects in the frame, 'darkPix' the darkest pixel of hologram reconstructions over a z sweep (DarkPix.py, for tiny plankton, always uses the background model)
+DARK_PIX_Z=(4000,7000,500) # darkPix z sweep in microns, (min,max,step) as in range()
+DARK_PIX_THRESH=2       # darkPix binary threshold, lower values detect more objects
+DARK_PIX_BLUR=7
+DARK_PIX_MIN_AREA=50; DARK_PIX_MAX_AREA=1500;
+DARK_PIX_MAX_OBJ=50     # most objects kept per frame by darkPix
 
 # tracker
 MAX_MATCH_DISTANCE=100  # obj must be this close or better to track ID, couold be as low as 20 based on analysis
 MAX_DELTA_AREA=0.2      # tracker won't match with object if caused large percent change in area
+TRACK_MODE='object'     # 'object' matches each object in turn to the closest unassigned one, 'frame' matches all objects of a frame at once (best for dense samples)
 
 # speed
 SPEED_WINDOW=10
 MIN_SPEED=10            # objects slower than this are rejected
 
+# track kinematics, one row per track returned by Feature.calcSpeed(obj,kinematics=True)
+kinematicsHeader='trackID,points,pathLength,meanSpeed,heading,tortuosity'
+KIN_TRACK_ID=0; KIN_POINTS=1; KIN_PATH_LENGTH=2; KIN_MEAN_SPEED=3; KIN_HEADING=4; KIN_TORTUOSITY=5;
+MAX_KIN_COL=6
+
 # Clustering
 PCA_COMPONENTS=3        # how many PCA components
 N_CLUSTERS=10            # how many K Means clusters
 
 # feature 
 MAX_FEATURES=68 # number of features getFeatures returns. Area is the first feature
+FEATURE_GROUPS=('shape','hu','zernike','haralick','hist','lbp') # feature groups to compute (see Feature.FEATURE_GROUPS), e.g. ('shape','hist') for line rate on the Pi
+FEATURE_BATCH=1         # 1 computes the features of all objects in a frame together (Feature.getFeaturesBatch), 0 one object at a time
 
-# obj file header and index pointers
+# obj file header and index pointers, Feature.getHeader() gives the header with every column name
+objectHeader='frame,trackID,cluster,clusterReject,class,classReject,x0,y0,x1,y1,xc,yc,trackDistance,deltaArea,speed'
 header='frame,trackID,cluster,clusterReject,class,classReject,x0,y0,x1,y1,xc,yc,trackDistance,deltaArea,speed,area,aspectRatio,texture,solidity,eMajor,eMinor,contourLen,perimeter,radius,mean,std'
 
 # detection and feature column pointers
@@ -53,6 +75,7 @@ FS=FEATURE_START;               # FS is an abbreviation so I don't have to keep
 AREA=FS; ASPECT_RATIO=FS+1; TEXTURE=FS+2; SOLIDITY=FS+3; E_MAJOR=FS+4;
 E_MINOR=FS+5; CONTOUR_LEN=FS+6; PERIMETER=FS+7; RADIUS=FS+8; MEAN=FS+9; STD=FS+10;
 FEATURE_END=FS+MAX_FEATURE_VECTOR;
+Z_DEPTH=FEATURE_END;            # darkPix object distance from the sensor (meters), z where most of its pixels were darkest
 PCA_1=FEATURE_END+1; PCA_2=PCA_1+1; PCA_3=PCA_2+1; MAX_OBJ_COL=PCA_3+1 
 
 # GRID CONSTRUCTION
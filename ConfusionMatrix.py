@@ -10,10 +10,11 @@ from sklearn.metrics import confusion_matrix
 import matplotlib.pyplot as plt
 import numpy as np
 import seaborn as sn
+import ObjectFile as OF # reads binary object files and CSV
 
 # Constants
 VID_FILE_NAME=r'planktonVariety_960_544.mp4'
-OBJECT_ARRAY_FILE_NAME=r'FeaturesForConfusionMatrix.csv'
+OBJECT_ARRAY_FILE_NAME=r'FeaturesForConfusionMatrix.csv'  # or the .cols object file made by python ObjectFile.py FeaturesForConfusionMatrix.csv
 # detection and feature column pointers
 FRAME=0; TRACK_ID=1; TRACK_STATUS=2; CLUSTER=3; CLUSTER_REJECT=4; GRID_INDEX=5; CLASS=6;
 X0=7; Y0=8; X1=9; Y1=10; XC=11; YC=12; TRACK_DISTANCE=13; DELTA_AREA=14; SPEED=15; 
@@ -27,8 +28,10 @@ FEATURE_END=FS+MAX_FEATURE_VECTOR;
 PCA_1=FEATURE_END+1; PCA_2=PCA_1+1; PCA_3=PCA_2+1; MAX_OBJ_COL=PCA_3+1 
 
 ######### PROGRAM STARTS HERE ######################
-# Load array
-objectArray=np.loadtxt(OBJECT_ARRAY_FILE_NAME,skiprows=1,delimiter=',')
+# Load array, only the columns used here are read from an object file (the rest of objectArray stays 0)
+objectFile=OF.load(OBJECT_ARRAY_FILE_NAME,[CLUSTER,CLUSTER_REJECT,GRID_INDEX,PCA_1,PCA_2,PCA_3])
+objectArray=np.zeros((len(objectFile),MAX_OBJ_COL))
+objectArray[:,[CLUSTER,CLUSTER_REJECT,GRID_INDEX,PCA_1,PCA_2,PCA_3]]=objectFile
 ds=np.where(objectArray[:,GRID_INDEX]>0)
 print('Original grid images',len(ds[0]))
 
@@ -0,0 +1,111 @@
+# DARK PIXEL DETECTOR
+# Detects tiny plankton in hologram video by the darkest pixel of reconstructions over a z sweep, a Detect stage
+# V4 18 Oct 2026 findObjects enlarge=False keeps contour boxes and edge objects, findContours for OpenCV 3 and 4
+# V3 18 Oct 2026 darkPixel tiled reconstructs in tiles with the same float min
+# V2 18 Oct 2026 detectFrame raises ValueError without a background, XC,YC is the middle of the box
+# V1 18 Oct 2026 from the main loop of darkPixReco.py
+#
+# Tiny plankton make fringes with little or no contrast in the raw frame, but each one is dark in the reconstruction at
+# its own z. The frame (background subtracted) is reconstructed at every z of C.DARK_PIX_Z and the darkest intensity of
+# each pixel is kept (reco.reconstructMin, reduced in place in float) with the z it came from. The darkest pixel image is
+# blurred, thresholded and its contours become objects, in the row layout of Detect.detectFrame, so Track, Feature,
+# ObjectWriter, Checkpoint and Batch work unchanged. Features are computed on the darkest pixel image.
+# C.Z_DEPTH of each object is the median z (meters) where its pixels were darkest, a depth estimate for free.
+# X0..Y1 is the contour box enlarged by C.ENLARGE on each side (Detect.checkROI, boxes touching the frame edge are
+# rejected, findObjects enlarge=False keeps the contour box and edge objects as darkPixReco.py does) and XC,YC is its middle, the middle of the contour box. Detect's XC,YC are x0+(x0+x1)/2, y0+(y0+y1)/2,
+# so use the box columns to compare positions between the two detectors.
+# The frame must be background subtracted, the unflattened frame saturates the threshold and gives no objects.
+# Detect.detectTrackFeature turns on its background model when C.DETECTOR=='darkPix' (C.BACKGROUND_MODE).
+#
+# usage:  C.DETECTOR='darkPix' then Detect.detectTrackFeature(vid) or Batch.py --set DETECTOR=darkPix
+#         or per frame: (rowArray,threshIM)=DP.detectFrame(colorIM,frameCount,bkgIM)
+#
+# Thomas Zimmerman IBM Research-Almaden, Center for Cellular Construction (https://ccc.ucsf.edu/)
+# This work is funded by the National Science Foundation (NSF) grant No. DBI-1548297
+# Disclaimer:  Any opinions, findings and conclusions or recommendations expressed in this material are those of the authors and do not necessarily reflect the views of the National Science Foundation.
+
+import numpy as np
+import cv2
+import Common as C
+import Feature as F
+import Profile as P
+import Detect as D  # maskIM and checkROI, used at run time only so the two modules can import each other
+import reco as vc
+
+def zSweep(zMicrons=None):
+    # reconstruction distances in meters from (min,max,step) in microns, default C.DARK_PIX_Z
+    (minZ,maxZ,zStep)=C.DARK_PIX_Z if zMicrons is None else zMicrons
+    return([z*1e-6 for z in range(minZ,maxZ,zStep)])
+
+def darkPixel(grayIM,zList,wvlen=vc.WVLEN,dxy=vc.DXY,tiled=False):
+    # returns (darkIM,zIndexIM), the darkest intensity of each pixel over zList as uint8 and its position in zList
+    # tiled reconstructs in tiles (vc.reconstructTiled) for less memory, the min is kept in float and clipped here either way
+    if tiled:
+        (minIM,zIndexIM)=vc.reconstructTiled(grayIM,zList,'argminFloat',wvlen,dxy)
+    else:
+        (minIM,zIndexIM)=vc.reconstructMin(grayIM,zList,wvlen,dxy)
+    darkIM=np.minimum(minIM,255).astype('uint8')
+    return(darkIM,zIndexIM)
+
+def findObjects(darkIM,zIndexIM,zList,frameCount,groups=None,thresh=None,blur=None,minArea=None,maxArea=None,maxObj=None,enlarge=True):
+    # objects of a darkest pixel image as rows with C.MAX_OBJ_COL columns (tracking columns are left at zero)
+    # groups are the feature groups computed, default C.FEATURE_GROUPS, () for none. Returns (rowArray,threshIM)
+    # enlarge grows boxes by C.ENLARGE and drops objects touching the frame edge like Detect, False keeps the contour box
+    groups=C.FEATURE_GROUPS if groups is None else groups
+    thresh=C.DARK_PIX_THRESH if thresh is None else thresh
+    blur=C.DARK_PIX_BLUR if blur is None else blur
+    minArea=C.DARK_PIX_MIN_AREA if minArea is None else minArea
+    maxArea=C.DARK_PIX_MAX_AREA if maxArea is None else maxArea
+    maxObj=C.DARK_PIX_MAX_OBJ if maxObj is None else maxObj
+    (yRez,xRez)=darkIM.shape
+    zArray=np.asarray(zList)
+    with P.stage('blur'):
+        blurIM=cv2.medianBlur(darkIM,blur) # blur image to fill in holes to make solid object
+    with P.stage('threshold'):
+        ret,threshIM = cv2.threshold(blurIM,thresh,255,cv2.THRESH_BINARY) # threshold image to make pixels 0 or 255
+    with P.stage('findContours'):
+        contourList=cv2.findContours(threshIM, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)[-2] # all countour points, uses more memory, [-2] for OpenCV 3 and 4
+    rows=[]
+    rois=[]
+    for objContour in contourList:
+        if len(rows)>=maxObj:
+            break
+        area=cv2.contourArea(objContour)
+        if area<minArea or area>=maxArea:    # only detect acceptable size objects
+            continue
+        PO=cv2.boundingRect(objContour)
+        x0=PO[0]; y0=PO[1]; x1=x0+PO[2]; y1=y0+PO[3]; xc=(x0+x1)/2; yc=(y0+y1)/2;  # middle of the box
+        if enlarge:
+            (touch,x0,y0,x1,y1)=D.checkROI(xRez,yRez,x0,y0,x1,y1)   # enlarged by C.ENLARGE on each side, same middle
+            if touch:
+                continue
+        with P.stage('maskIM'):
+            (darkROI,binaryROI)=D.maskIM(darkIM,objContour,x0,y0,x1,y1)
+        row=np.zeros(C.MAX_OBJ_COL)
+        row[C.FRAME]=frameCount; row[C.X0:C.YC+1]=(x0,y0,x1,y1,xc,yc); row[C.AREA]=area
+        row[C.Z_DEPTH]=np.median(zArray[zIndexIM[y0:y1,x0:x1][binaryROI>0]])
+        rows.append(row)
+        rois.append((darkROI,binaryROI.copy(),objContour))  # copy, binaryROI is overwritten by the next maskIM
+    rowArray=np.array(rows).reshape(-1,C.MAX_OBJ_COL)
+    if len(rois)>0 and len(groups)>0:
+        area=rowArray[:,C.AREA].copy()
+        F.getFeaturesBatch(rois,groups,out=rowArray[:,C.FEATURE_START:C.FEATURE_END])
+        rowArray[:,C.AREA]=area
+    return(rowArray,threshIM)
+
+def detectFrame(colorIM,frameCount,bkgIM=None):
+    # same interface as Detect.detectFrame, which calls it when C.DETECTOR=='darkPix'
+    # bkgIM (gray background) is required, raises ValueError without it
+    if bkgIM is None:
+        raise ValueError('DarkPix.detectFrame needs the background image bkgIM, the frame must be background subtracted')
+    P.setFrame(frameCount)
+    with P.stage('gray'):
+        grayIM=cv2.cvtColor(colorIM, cv2.COLOR_BGR2GRAY)    # convert color to grayscale image
+    with P.stage('flatten'):
+        grayIM=cv2.subtract(grayIM,bkgIM)   # leaves the fringes of moving objects
+    with P.stage('z sweep'):
+        (darkIM,zIndexIM)=darkPixel(grayIM,zSweep())
+    (rowArray,threshIM)=findObjects(darkIM,zIndexIM,zSweep(),frameCount)
+    if not C.DEBUG:
+        threshIM=None   # don't send the image back from a worker if it won't be displayed
+    return(rowArray,threshIM)
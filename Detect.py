@@ -2,11 +2,36 @@
 
 import Feature as F
 import Track as T
+import Background as B
+import ObjectTable as OT
+import FrameSource as FS
+import Profile as P
+import Checkpoint as CK
+import ObjectWriter as OW
+import ObjectFile as OF
+import DarkPix as DP
 import numpy as np
 import cv2
 import Common as C
 import colorsys
+import multiprocessing as mp
+from collections import deque
 
+# V25 Oct 18, 2026 the background model is always on with C.DETECTOR='darkPix', which needs it
+# V24 Oct 18, 2026 track IDs start at 1 for every video that isn't resumed, so a video's IDs don't depend on earlier videos
+# V23 Oct 18, 2026 C.DETECTOR='darkPix' detects with the darkest pixel of a z sweep of reconstructions (DarkPix.py)
+# V22 Oct 18, 2026 objectFile ending with .cols is written as a binary object file (ObjectFile)
+# V21 Oct 18, 2026 Optional streaming output (objectFile), rows are written as frames are tracked instead of kept to the end
+# V20 Oct 18, 2026 Checkpoint every C.CHECKPOINT_EVERY frames and resume from the last checkpoint
+# V19 Oct 18, 2026 Stages timed with Profile when C.PROFILE, summary printed and trace written at the end of the video
+# V18 Oct 18, 2026 Features of all objects in a frame computed together (F.getFeaturesBatch) when C.FEATURE_BATCH
+# V17 Oct 18, 2026 Only the feature groups in C.FEATURE_GROUPS are computed
+# V16 Oct 18, 2026 maskIM draws the contour into an ROI sized scratch buffer and masks the gray image, no full frame mask per object
+# V15 Oct 18, 2026 Frames decoded on a background thread (FrameSource)
+# V14 Oct 18, 2026 Detection and features of each frame can run in a process pool (C.WORKERS), tracking stays in frame order
+# V13 Oct 18, 2026 Optional frame-level tracking with global assignment (C.TRACK_MODE='frame')
+# V12 Oct 18, 2026 Objects stored in a growable ObjectTable instead of np.append per object
+# V11 Oct 18, 2026 Optional streaming background subtraction (C.BACKGROUND)
 # V10 Nov 10, 2020 If MAX_FRAME==0, read all the frames.
 # V9 Nov  4, 2020 Put a white border around original image in case it has a black border, to prevent findContour detecting whole image as one object
 # V8 Oct 24, 2020 Got rid of objectVector by writing directly into ObjectArray
@@ -31,21 +56,35 @@ def checkROI(xMaxRez,yMaxRez,xx0,yy0,xx1,yy1):
         touch=1
     return(touch,x0,y0,x1,y1)
 
-def maskIM(colorIM,threshIM,cnt,x0,y0,x1,y1):
-    # create a mask based on image contour
-    blackIM=np.zeros_like(threshIM)
-    cv2.drawContours(blackIM, [cnt], -1,255,-1) # function takes array of arrays so need [objContour] !!!
-    binaryROI=blackIM[y0:y1,x0:x1]
-    colorROI=colorIM[y0:y1,x0:x1]
-    colorROI = cv2.bitwise_and(colorROI,colorROI,mask = binaryROI)
-    grayROI = cv2.cvtColor(colorROI, cv2.COLOR_BGR2GRAY)     # convert color to grayscale image
-    return(colorROI,grayROI,binaryROI)
-
-def imageProcessing(colorIM):
-    grayIM = cv2.cvtColor(colorIM, cv2.COLOR_BGR2GRAY)     # convert color to grayscale image
-    blurIM=cv2.medianBlur(grayIM,C.BLUR)                 # blur image to fill in holes to make solid object
-    ret,threshIM = cv2.threshold(blurIM,C.THRESH,255,cv2.THRESH_BINARY_INV) # threshold image to make pixels 0 or 255
-    dummy,contourList, hierarchy = cv2.findContours(threshIM, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE) # all countour points, uses more memory
+maskScratch=np.zeros(0,dtype='uint8')   # mask buffer reused by every object, grows to the largest ROI
+
+def maskIM(grayIM,cnt,x0,y0,x1,y1):
+    # create a mask of the ROI based on image contour
+    # binaryROI is a scratch buffer that is overwritten by the next call, so use it before masking the next object
+    global maskScratch
+    h=y1-y0; w=x1-x0
+    if len(maskScratch)<h*w:
+        maskScratch=np.zeros(2*h*w,dtype='uint8')
+    binaryROI=maskScratch[:h*w].reshape(h,w)
+    binaryROI.fill(0)
+    cv2.drawContours(binaryROI, [cnt], -1,255,-1,offset=(-x0,-y0)) # function takes array of arrays so need [objContour] !!!, offset moves contour into ROI
+    grayROI=grayIM[y0:y1,x0:x1]
+    grayROI = cv2.bitwise_and(grayROI,grayROI,mask = binaryROI)
+    return(grayROI,binaryROI)
+
+def imageProcessing(colorIM,bkgIM=None):
+    with P.stage('gray'):
+        grayIM = cv2.cvtColor(colorIM, cv2.COLOR_BGR2GRAY)     # convert color to grayscale image
+    detectIM=grayIM
+    if bkgIM is not None:
+        with P.stage('flatten'):
+            detectIM=B.flatten(grayIM,bkgIM)                   # remove uneven illumination, features still use grayIM
+    with P.stage('blur'):
+        blurIM=cv2.medianBlur(detectIM,C.BLUR)                 # blur image to fill in holes to make solid object
+    with P.stage('threshold'):
+        ret,threshIM = cv2.threshold(blurIM,C.THRESH,255,cv2.THRESH_BINARY_INV) # threshold image to make pixels 0 or 255
+    with P.stage('findContours'):
+        dummy,contourList, hierarchy = cv2.findContours(threshIM, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE) # all countour points, uses more memory
     return(grayIM,threshIM,blurIM,contourList)
 
 def debugDisplay(oi,objectArray,match,rectIM):
@@ -74,78 +113,214 @@ def debugDisplay(oi,objectArray,match,rectIM):
             cv2.rectangle(rectIM, (x0,y0), (x1,y1), (200,200,200), C.THICK)  
     return(rectIM)
 
-def detectTrackFeature(VID):
+def paintBorder(colorIM):
+    # put a white border around image in case it has a black border
+    # so the entire frame won't be detected as one object
+    BORDER=10
+    colorIM[0:BORDER,:,:]=255        # get rid of black boarder around image, turn it white so it won't appear as an object
+    colorIM[-BORDER:,:]=255        # get rid of black boarder around image, turn it white so it won't appear as an object
+    colorIM[:,0:BORDER,:]=255        # get rid of black boarder around image, turn it white so it won't appear as an object
+    colorIM[:,-BORDER:,:]=255        # get rid of black boarder around image, turn it white so it won't appear as an object
+    return(colorIM)
+
+def detectFrame(colorIM,frameCount,bkgIM=None):
+    # detect objects in one frame and get their features, does not need any other frame so can run in a worker process
+    # returns rows with object columns and features filled in (tracking columns are left at zero) and threshIM for debug display
+    if C.DETECTOR=='darkPix':
+        return(DP.detectFrame(colorIM,frameCount,bkgIM))
+    (yColorIM,xColorIM,color)=colorIM.shape
+    P.setFrame(frameCount)
+
+    # do image processing
+    (grayIM,threshIM,blurIM,contourList)=imageProcessing(colorIM,bkgIM)
+
+    rows=[]
+    rois=[]     # (grayROI,binaryROI,objContour) of every object when features are computed as a batch
+    for objContour in contourList:
+        area = cv2.contourArea(objContour)
+
+        # Get bounding box for ROI
+        PO = cv2.boundingRect(objContour)
+        x0=PO[0]; y0=PO[1]; x1=x0+PO[2]; y1=y0+PO[3]; xc=x0+(x0+x1)/2; yc=y0+(y0+y1)/2;
+
+        # check if object at the edge of image
+        (touch,x0,y0,x1,y1)=checkROI(xColorIM,yColorIM,x0,y0,x1,y1) # return 1 if obj touches edge
+        if area>C.MAX_AREA:
+            print('MAX_AREA detected. touch',touch,'area',area,'len(contourList)',len(contourList))
+        if area>C.MIN_AREA and area<C.MAX_AREA and touch==0:    # only process objects of good size that don't touch image edge
+            # assign columns to obj variables
+            row=np.zeros(C.MAX_OBJ_COL)
+
+            # Get ROI using a mask to eliminate everything in the ROI except the object
+            with P.stage('maskIM'):
+                (grayROI,binaryROI)=maskIM(grayIM,objContour,x0,y0,x1,y1) # mask image using contour to eliminate any other objects in ROI                 
+
+            # Get object features
+            if C.FEATURE_BATCH:
+                rois.append((grayROI,binaryROI.copy(),objContour))  # copy, binaryROI is overwritten by the next maskIM
+            else:
+                featureVector=F.getFeatures(grayROI, binaryROI, objContour, C.FEATURE_GROUPS)
+                row[C.FEATURE_START:C.FEATURE_END]=featureVector
+            row[C.FRAME]=frameCount;    row[C.X0:C.YC+1]=(x0,y0,x1,y1,xc,yc); row[C.AREA]=area; # area is needed by the tracker even if shape features are not computed
+            rows.append(row)
+    rowArray=np.array(rows).reshape(-1,C.MAX_OBJ_COL)
+    if C.FEATURE_BATCH and len(rois)>0:
+        area=rowArray[:,C.AREA].copy()
+        F.getFeaturesBatch(rois,C.FEATURE_GROUPS,out=rowArray[:,C.FEATURE_START:C.FEATURE_END])
+        rowArray[:,C.AREA]=area
+    if not C.DEBUG:
+        threshIM=None   # don't send the image back from a worker if it won't be displayed
+    return(rowArray,threshIM)
+
+def profiledDetectFrame(colorIM,frameCount,bkgIM=None):
+    # detectFrame in a worker process, also returns the stages timed in the worker so the main process can add them
+    with P.stage('detect'):
+        result=detectFrame(colorIM,frameCount,bkgIM)
+    return(result,P.collect())
+
+def commonSettings():
+    # Common parameters, passed to worker processes so changes made at run time reach them
+    return({name:value for name,value in vars(C).items() if name.isupper()})
+
+def initWorker(settings):
+    for name,value in settings.items():
+        setattr(C,name,value)
+
+def readFrames(cap,bkgModel,frameCount=0,checkpointEvery=0):
+    # reads and detects frames in order, yields (frameCount,rectIM,rowArray,threshIM,bkgState)
+    # with C.WORKERS>1 frames are detected in a process pool while the caller tracks earlier frames,
+    # at most C.WORKERS*C.WORKER_QUEUE frames are in flight
+    # frameCount is the number of the first frame cap returns. bkgState is a copy of the background model after every
+    # checkpointEvery frames (the model runs ahead of tracking when frames are in flight), otherwise None
+    pool=None
+    if C.WORKERS>1:
+        pool=mp.Pool(C.WORKERS,initWorker,(commonSettings(),))
+    pending=deque()     # (frameCount,rectIM,result,bkgState) in frame order
+    try:
+        while True:
+            # read frames until the queue is full
+            while cap.isOpened() and len(pending)<max(1,C.WORKERS*C.WORKER_QUEUE):
+                if C.MAX_FRAME!=0 and frameCount>C.MAX_FRAME: # end processing if reaches max frame (in case request to process partial video)
+                    break
+                P.setFrame(frameCount)
+                with P.stage('decode'):
+                    ret, colorIM = cap.read()
+                if not ret: # check to make sure there was a frame to read
+                    print('End of video detected, so finish')
+                    break
+                rectIM=None
+                if C.DEBUG:
+                    rectIM=np.copy(colorIM) # make copy that can be marked up with rectangles
+                with P.stage('border'):
+                    colorIM=paintBorder(colorIM)
+                bkgIM=None; bkgState=None
+                if bkgModel is not None:    # background is updated in frame order
+                    with P.stage('background'):
+                        bkgIM=bkgModel.update(cv2.cvtColor(colorIM, cv2.COLOR_BGR2GRAY))
+                    if checkpointEvery and (frameCount+1)%checkpointEvery==0:
+                        bkgState=bkgModel.getState()
+                if pool is None:
+                    with P.stage('detect'):
+                        pending.append((frameCount,rectIM,detectFrame(colorIM,frameCount,bkgIM),bkgState))
+                elif C.PROFILE:
+                    pending.append((frameCount,rectIM,pool.apply_async(profiledDetectFrame,(colorIM,frameCount,bkgIM)),bkgState))
+                else:
+                    pending.append((frameCount,rectIM,pool.apply_async(detectFrame,(colorIM,frameCount,bkgIM)),bkgState))
+                frameCount+=1
+            if len(pending)==0:
+                break
+            (fc,rectIM,result,bkgState)=pending.popleft()
+            if pool is not None:
+                with P.stage('wait for worker'):
+                    result=result.get()
+                if C.PROFILE:
+                    (result,collected)=result
+                    P.merge(collected)
+            (rowArray,threshIM)=result
+            yield(fc,rectIM,rowArray,threshIM,bkgState)
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+def detectTrackFeature(VID,checkpointFile=None,resume=False,objectFile=None):
     # processes video, returns obj file with obj location, features, etc for video
+    # with an objectFile the rows of each frame are written to it once tracked (ObjectWriter) and only the last frame is
+    # kept in memory, returns (status,number of rows written) instead of (status,objectArray)
+    # with a checkpointFile and C.CHECKPOINT_EVERY>0 the state is saved every C.CHECKPOINT_EVERY frames, rows before the
+    # last frame are moved from memory to the checkpoint. resume=True continues from the checkpoint if there is one,
+    # giving the same objects as an uninterrupted run
     status=0        # return status, 1=good (found and processed video)
+    checkpoint=checkpointFile is not None and C.CHECKPOINT_EVERY>0
+    state=None
+    if checkpoint and resume and CK.exists(checkpointFile):
+        (state,bkgState)=CK.load(checkpointFile)
+        print('Resume from checkpoint',checkpointFile,'at frame',state['frame'])
+    elif checkpoint:
+        CK.remove(checkpointFile)   # don't mix rows of an old run into this one
 
-    # Create objectArray to store objectArray+featureVector
-    objectArray=np.zeros((0,C.MAX_OBJ_COL), dtype='float') # array of all objects for all frames
-    objectArrayZero=np.zeros((1,C.MAX_OBJ_COL), dtype='float') # one row filled with zeros to append at beginning of loop
+    # Create objectTable to store objectArray+featureVector
+    objectTable=OT.ObjectTable()        # table of all objects for all frames, grows without copying every row
+    objectArray=objectTable.rows        # view of the rows filled so far
 
     print('Detect, Feature, Track video',VID)
-    cap = cv2.VideoCapture(VID)
-    frameCount=0    # keep video reader and object processing in sync
+    P.reset()
+    bkgModel=None
+    if C.BACKGROUND or C.DETECTOR=='darkPix':    # darkPix finds objects in the frame minus the background
+        bkgModel=B.BackgroundModel(C.BACKGROUND_MODE)
+        if state is not None:
+            bkgModel.setState(bkgState)
+        else:
+            warmCap=cv2.VideoCapture(VID)   # initialize background without moving the main reader
+            B.warmUp(warmCap,bkgModel)
+            warmCap.release()
     oi=0            # object index, points into objectArray
     oiStart=0       # first obj of first frame (frameCount=0)
+    oiStop=0
+    startFrame=0
     match=False     # tracking flag, true if obj match found
+    if state is not None:
+        for row in state['rows']:   # objects of the last frame before the checkpoint
+            objectTable.data[objectTable.addRow()]=row
+        T.nextID=state['nextID']
+        (startFrame,oiStart,oiStop,oi,status)=(state['frame'],state['oiStart'],state['oiStop'],state['oi'],state['status'])
+    else:
+        T.nextID=1      # Track keeps counting across calls, e.g. several videos in one Batch process
+    writer=None
+    if objectFile is not None:
+        writerState=None
+        if state is not None:
+            writerState={name[len('writer_'):]:value for name,value in state.items() if name.startswith('writer_')}
+        writer=OW.ObjectWriter(objectFile,F.getHeader(C.FEATURE_GROUPS),state=writerState)
+    cap = FS.FrameSource(VID,startFrame,exact=True)   # decodes on a background thread while frames are processed
 
-    while(cap.isOpened()):  # start frame capture
-        # get image
-        ret, colorIM = cap.read()
-        rectIM=np.copy(colorIM) # make copy that can be marked up with rectangles
-        if not ret: # check to make sure there was a frame to read
-            print('End of video detected, so finish')
-            break
-        
-        # put a white border around image in case it has a black border
-        # so the entire frame won't be detected as one object
-        BORDER=10
-        colorIM[0:BORDER,:,:]=255        # get rid of black boarder around image, turn it white so it won't appear as an object
-        colorIM[-BORDER:,:]=255        # get rid of black boarder around image, turn it white so it won't appear as an object
-        colorIM[:,0:BORDER,:]=255        # get rid of black boarder around image, turn it white so it won't appear as an object
-        colorIM[:,-BORDER:,:]=255        # get rid of black boarder around image, turn it white so it won't appear as an object
-        (yColorIM,xColorIM,color)=colorIM.shape
-        
-        
-        # do image processing
-        (grayIM,threshIM,blurIM,contourList)=imageProcessing(colorIM)
-        
-        # draw bounding boxes around objects
+    for (frameCount,rectIM,rowArray,threshIM,bkgState) in readFrames(cap,bkgModel,startFrame,C.CHECKPOINT_EVERY if checkpoint else 0):
+        # add objects to objectTable and track them in detection order
         oiStop=oi       # first object of the last frame
         assigned=[]     # create obj assigned list for tracker
-        goodObjCount=0  # counts number of objects of acceptable area and no touch
-        for objContour in contourList:
-            area = cv2.contourArea(objContour)
-
-            # Get bounding box for ROI
-            PO = cv2.boundingRect(objContour)
-            x0=PO[0]; y0=PO[1]; x1=x0+PO[2]; y1=y0+PO[3]; xc=x0+(x0+x1)/2; yc=y0+(y0+y1)/2;
-
-            # check if object at the edge of image
-            (touch,x0,y0,x1,y1)=checkROI(xColorIM,yColorIM,x0,y0,x1,y1) # return 1 if obj touches edge
-            if area>C.MAX_AREA:
-                print('MAX_AREA detected. touch',touch,'area',area,'len(contourList)',len(contourList))
-            if area>C.MIN_AREA and area<C.MAX_AREA and touch==0:    # only process objects of good size that don't touch image edge
-                goodObjCount+=1     # count number of acceptable objects
-                # add a row of zeros and assign columns to obj variables
-                objectArray=np.append(objectArray,objectArrayZero,axis=0)  # append empty row to objectArray, then fill with values 
-                objectArray[oi,C.FRAME]=frameCount;    objectArray[oi,C.X0:C.YC+1]=(x0,y0,x1,y1,xc,yc); objectArray[oi,C.AREA]=area;
-                
-                # Get ROI using a mask to eliminate everything in the ROI except the object
-                (colorROI,grayROI,binaryROI)=maskIM(colorIM,threshIM,objContour,x0,y0,x1,y1) # mask images using contour to eliminate any other objects in ROI                 
-                
-                # Track to get object ID
-                (match,assigned,objectArray)=T.trackObject(objectArray,oi,oiStart,oiStop,assigned)
-
-                # Get object features, add to objectArray, then append objectArray to objectArray
-                featureVector=F.getFeatures(grayROI, binaryROI, objContour)
-                objectArray[oi,C.FEATURE_START:C.FEATURE_END]=featureVector
-                
-                # Debug display
-                if C.DEBUG:
-                    rectIM=debugDisplay(oi,objectArray,match,rectIM)
-                oi+=1                                                   # end of processing object so increment obj index
-                
+        P.setFrame(frameCount)
+        for row in rowArray:
+            oi=objectTable.addRow()             # append row to objectTable
+            objectArray=objectTable.rows
+            objectArray[oi]=row
+
+            # Track to get object ID
+            if C.TRACK_MODE=='object':
+                with P.stage('track'):
+                    (match,assigned,objectArray)=T.trackObject(objectArray,oi,oiStart,oiStop,assigned)
+
+            # Debug display
+            if C.DEBUG and C.TRACK_MODE=='object':
+                rectIM=debugDisplay(oi,objectArray,match,rectIM)
+            oi+=1                                                   # end of processing object so increment obj index
+
+        # Track all objects of the frame at once
+        if C.TRACK_MODE=='frame':
+            with P.stage('track'):
+                matchList=T.trackFrame(objectArray,oiStop,oi,oiStart,oiStop)
+            if C.DEBUG:
+                for i in range(oiStop,oi):
+                    rectIM=debugDisplay(i,objectArray,matchList[i-oiStop],rectIM)
+
         # Finished processing objects in frame. Get indexing locations for tracker
         if frameCount==0:
             oiStart=0       # first obj of first frame 
@@ -154,33 +329,64 @@ def detectTrackFeature(VID):
             oiStart=oiStop  # first obj of current frame 
 
         if C.DEBUG:
-            #cv2.imshow('blurIM', cv2.resize(blurIM,(C.X_REZ_DEBUG,C.Y_REZ_DEBUG)))      # display reduced image
             cv2.imshow('threshIM', cv2.resize(threshIM,(C.X_REZ_DEBUG,C.Y_REZ_DEBUG)))      # display reduced image
             cv2.imshow('rectIM', cv2.resize(rectIM,(C.X_REZ_DEBUG,C.Y_REZ_DEBUG)))      # display reduced image
-            #print('Frame',frameCount,'Good objects',goodObjCount)
             key=cv2.waitKey(10) & 0xFF # read key, test for 'q' quit, pause in msec
             if key== ord('q'):
                 break
 
-        # Finished processing frame, get ready to read and process next frame
+        # Finished processing frame
         status=1                # indicate that reading frames successfully
-        frameCount+=1           # increment frame counter
-        if frameCount%100==0:   # periodically give progress indicator to show program is running
-            print('Processed frame:',frameCount)
-        if C.MAX_FRAME!=0 and frameCount>C.MAX_FRAME: # end processing if reaches max frame (in case request to process partial video)
-            break
+        if (frameCount+1)%100==0:   # periodically give progress indicator to show program is running
+            print('Processed frame:',frameCount+1)
+
+        # Write the frame and keep only the rows the tracker needs
+        if writer is not None:
+            with P.stage('output'):
+                writer.addFrame(objectTable.rows[oiStart:oi])
+            objectTable.discard(oiStart)
+            (oiStop,oi,oiStart)=(oiStop-oiStart,oi-oiStart,0)
+            objectArray=objectTable.rows
+
+        # Save state and move rows tracking no longer needs out of memory
+        if checkpoint and (frameCount+1)%C.CHECKPOINT_EVERY==0:
+            with P.stage('checkpoint'):
+                objectArray=objectTable.rows
+                state={'rows':objectArray[oiStart:oi],'nextID':T.nextID,'frame':frameCount+1,
+                       'oiStart':0,'oiStop':oiStop-oiStart,'oi':oi-oiStart,'status':status}
+                if writer is not None:
+                    state.update({'writer_'+name:value for name,value in writer.getState().items()})
+                CK.save(checkpointFile,state,objectArray[:oiStart],bkgState)
+                objectTable.discard(oiStart)
+                (oiStop,oi,oiStart)=(oiStop-oiStart,oi-oiStart,0)
+                objectArray=objectTable.rows
         
     # Finished processing video so calc velocity and remove objects with features with NaN values
-    if status:                      # if able to process video, calculate velocity from distance measurements
-        objectArray=F.calcSpeed(objectArray)  # calc speed and place in obj feature columns
-        print('before touch reject',objectArray.shape)
-        objectArray=objectArray[~np.isnan(objectArray).any(axis=1)] # remove obj with features containing NaN values
-        print('after touch reject',objectArray.shape)
-        objectArray=objectArray[np.where(objectArray[:,C.SPEED]>C.MIN_SPEED)] # remove obj moving too slow
-        print('after min speed reject',objectArray.shape)
+    objectArray=objectTable.rows
+    if checkpoint:
+        objectArray=np.concatenate((CK.loadRows(checkpointFile),objectArray))   # rows saved by checkpoints come first
+    if writer is not None:          # speed and rejects were done frame by frame
+        writer.close()
+        print('wrote',writer.count,'of',writer.seen,'objects to',objectFile)
+    elif status:                    # if able to process video, calculate velocity from distance measurements
+        with P.stage('calcSpeed'):
+            objectArray=F.calcSpeed(objectArray)  # calc speed and place in obj feature columns
+        with P.stage('output'):
+            print('before touch reject',objectArray.shape)
+            objectArray=objectArray[~np.isnan(objectArray).any(axis=1)] # remove obj with features containing NaN values
+            print('after touch reject',objectArray.shape)
+            objectArray=objectArray[np.where(objectArray[:,C.SPEED]>C.MIN_SPEED)] # remove obj moving too slow
+            print('after min speed reject',objectArray.shape)
         
     cap.release()
-    cv2.destroyAllWindows()
+    if C.PROFILE:
+        print(P.summary())
+        if C.PROFILE>1:
+            P.writeTrace(C.PROFILE_FILE)
+    if C.DEBUG:
+        cv2.destroyAllWindows()
+    if writer is not None:
+        return(status,writer.count)
     return(status,objectArray)
 
 ########## TEST ###########
@@ -191,6 +397,6 @@ if False:
     objFile='test.csv'
     print('Processing',plankton)
     (status,objectArray)=detectTrack(vid)
-    np.savetxt(objFile,objectArray,header=C.header,fmt='%f',delimiter=',') # saves numpy array as a csv file    
+    OF.save(objFile,objectArray,F.getHeader(C.FEATURE_GROUPS)) # saves numpy array as a csv file, or an object file if objFile ends with .cols    
             
 
@@ -1,5 +1,11 @@
 # FEATURES EXTRACTION
 
+# V18 18 Oct 2026 zernikeBatch pixel vector renamed pix, P is the Profile module
+# V17 18 Oct 2026 header names the column before pca1 zDepth (C.Z_DEPTH, filled by DarkPix)
+# V16 18 Oct 2026 each feature group is timed by Profile
+# V15 18 Oct 2026 getFeaturesBatch computes the features of every ROI of a frame together, zernike, hist and lbp vectorized
+# V14 18 Oct 2026 features split into named groups, getFeatures computes only the groups requested
+# V13 18 Oct 2026 calcSpeed vectorized, optional per track kinematics (mean speed, heading, tortuosity)
 # V12 23 Oct 2020 renamed f as featureVector, ar and texture were reversed on creation of feature vector
 # V11 29 Sept 2020 replaced velocity with speed sampled over SPEED_WINDOW samples
 # V9 added aspectRatio to feature list
@@ -13,15 +19,13 @@ import cv2
 from skimage import feature
 from mahotas.zernike import zernike_moments
 from mahotas.features import haralick
+from mahotas import center_of_mass
 from scipy.stats import kurtosis,skew,entropy
 import math
 import Common as C  # constants used by all programs
+import Profile as P
 
-def getFeatures(grayROI, binaryROI, objContour):
-    # features are first converted to lists which makes them easier to append
-    # at the end of the function, they are converted to a numpy vector (1xN)
-    featureList=[]
-    
+def shapeFeatures(grayROI, binaryROI, objContour):
     #SHAPE
     # area
     area = cv2.contourArea(objContour)
@@ -58,28 +62,32 @@ def getFeatures(grayROI, binaryROI, objContour):
     (h,w)=grayROI.shape
     texture=float(onPix/(w*h))
     shape=[area,aspectRatio,texture,solidity,eMajor,eMinor,contourLen,perimeter,radius,mean,std]
-    featureList.append(shape)
+    return(shape)
 
+def huFeatures(grayROI, binaryROI, objContour):
     # HU MOMENTS
     moments = cv2.moments(binaryROI)
     hu = cv2.HuMoments(moments)
     huMoments = -np.sign(hu)*np.log10(np.abs(hu))
     huMoments=huMoments[:,0]
-    featureList.append(huMoments.tolist())
+    return(huMoments.tolist())
 
+def zernikeFeatures(grayROI, binaryROI, objContour):
     # ZERNIKE MOMENTS
     W, H = grayROI.shape
     R = min(W, H) / 2
     z = zernike_moments(grayROI, R, 8)
     zsum=np.sum(z[1:])
     z[0]=zsum           # first Zernike moment always constant so replace with sum
-    featureList.append(z.tolist())
+    return(z.tolist())
 
+def haralickFeatures(grayROI, binaryROI, objContour):
     # HARALICK FEATURES
     har = haralick(grayROI)
     haralickMean = har.mean(axis=0)
-    featureList.append(haralickMean[1:].tolist()) # first entry is usually 0
+    return(haralickMean[1:].tolist()) # first entry is usually 0
 
+def histFeatures(grayROI, binaryROI, objContour):
     # GRAYSCALE HISTOGRAM
     grayHist=np.zeros((5))
     histogram = cv2.calcHist([grayROI], [0], None, [255], [0, 255])
@@ -89,8 +97,9 @@ def getFeatures(grayROI, binaryROI, objContour):
     grayHist[3] = kurtosis(histogram)
     histNorm = histogram / np.max(histogram)
     grayHist[4] = entropy(histNorm)
-    featureList.append(grayHist.tolist())
-      
+    return(grayHist.tolist())
+
+def lbpFeatures(grayROI, binaryROI, objContour):
     # LOCAL BINARY PATTERNS
     eps=1e-7                            # so we don't divide by zero
     radius = 8
@@ -102,37 +111,265 @@ def getFeatures(grayROI, binaryROI, objContour):
     a=lbpHist[0:6]                      # take the first 6 values and last 2 values, the rest are usually 0
     b=lbpHist[-2:]
     c=np.concatenate((a, b))
-    featureList.append(c.tolist())
+    return(c.tolist())
+
+# Feature groups in column order: name -> (function, column names). Every group always occupies
+# the same columns of the feature vector, groups that are not requested are left at 0.
+FEATURE_GROUPS={
+    'shape':(shapeFeatures,['area','aspectRatio','texture','solidity','eMajor','eMinor','contourLen','perimeter','radius','mean','std']),
+    'hu':(huFeatures,['hu_%d' % i for i in range(7)]),
+    'zernike':(zernikeFeatures,['zer_%d' % i for i in range(25)]),
+    'haralick':(haralickFeatures,['har_%d' % i for i in range(12)]),
+    'hist':(histFeatures,['gray_%d' % i for i in range(5)]),
+    'lbp':(lbpFeatures,['lbp_%d' % i for i in range(8)]),
+}
+FEATURE_OFFSET={}   # group name -> first column of the group in the feature vector
+_offset=0
+for _name,(_function,_columns) in FEATURE_GROUPS.items():
+    FEATURE_OFFSET[_name]=_offset
+    _offset+=len(_columns)
+
+def checkGroups(groups):
+    for name in groups:
+        if name not in FEATURE_GROUPS:
+            raise ValueError('unknown feature group '+str(name)+', choose from '+','.join(FEATURE_GROUPS))
+    return(groups)
 
-    # convert featureList to featureVector (a numpy array 1xN)
-    ff=featureList[0]+featureList[1]+featureList[2]+featureList[3]+featureList[4]+featureList[5]
-    featureVector=np.array([ff])
-    #print('featureVector shape',featureVector.shape)
+def getFeatures(grayROI, binaryROI, objContour, groups=None):
+    # returns a numpy vector (1xN) of C.MAX_FEATURE_VECTOR features
+    # groups is a list of FEATURE_GROUPS names to compute, default all of them
+    if groups is None:
+        groups=FEATURE_GROUPS
+    featureVector=np.zeros((1,C.MAX_FEATURE_VECTOR))
+    for name in checkGroups(groups):
+        (function,columns)=FEATURE_GROUPS[name]
+        start=FEATURE_OFFSET[name]
+        with P.stage('feature '+name):
+            featureVector[0,start:start+len(columns)]=function(grayROI, binaryROI, objContour)
     return(featureVector)
 
-def calcSpeed(obj):
-    # speed calculated as distance between two points separated by SPEED_WINDOW frames
+# BATCH FEATURES
+# Each batch function takes a list of (grayROI, binaryROI, objContour) and returns an array with one row per ROI,
+# giving the same values as the single ROI function without paying the per call setup for every object
 
-    oc=obj[np.lexsort((obj[:,C.FRAME],obj[:,C.TRACK_ID]))] # sort by ID then FRAME
-    startIndex=0                    # index where new ID starts
-    speed=0
-    myID=-1                         # used to detect new ID which resets filter
-    for oi in range(len(obj)):
-        if myID!=oc[oi,C.TRACK_ID]:       # when new ID detected, reset filter
-            myID=oc[oi,C.TRACK_ID]        # update ID
-            startIndex=oi           # location of first obj of new ID
-            oc[oi,C.SPEED]=0        # initialize new ID speed
-        else:
-            if oi-startIndex<=C.SPEED_WINDOW:  # if window hasn't been reached, set speed to zero
-                speed=0
-                oc[oi,C.SPEED]=speed
+_zernikeBasis={}        # degree -> (radial polynomial coefficients, n, l) of every moment
+_zernikeGrid={}         # ROI shape -> (Y,X) pixel coordinates
+MAX_ZERNIKE_GRID=64     # number of ROI shapes to keep coordinates for
+
+def zernikeBasis(degree):
+    # coefficient table of the radial polynomials, row j is moment j (same order as mahotas), column k multiplies D**k
+    if degree not in _zernikeBasis:
+        nl=[(n,l) for n in range(degree+1) for l in range(n+1) if (n-l)%2==0]
+        coef=np.zeros((len(nl),degree+1))
+        for j,(n,l) in enumerate(nl):
+            for m in range((n-l)//2+1):
+                sign=-1 if m%2 else 1
+                coef[j,n-2*m]=sign*math.factorial(n-m)/(math.factorial(m)*math.factorial((n-2*m+l)//2)*math.factorial((n-2*m-l)//2))
+        _zernikeBasis[degree]=(coef,np.array([n for n,l in nl]),np.array([l for n,l in nl]))
+    return(_zernikeBasis[degree])
+
+def zernikeGrid(shape):
+    if shape not in _zernikeGrid:
+        if len(_zernikeGrid)>=MAX_ZERNIKE_GRID:
+            _zernikeGrid.clear()
+        Y,X=np.mgrid[:shape[0],:shape[1]]
+        _zernikeGrid[shape]=(Y.ravel().astype(np.double),X.ravel().astype(np.double))
+    return(_zernikeGrid[shape])
+
+def zernikeBatch(rois, degree=8):
+    # mahotas zernike_moments of every ROI. The polynomials are centered on each ROI's center of mass so they can't be
+    # precomputed, instead the pixels inside every ROI's unit circle are gathered and all moments are evaluated at once
+    coef,nArr,lArr=zernikeBasis(degree)
+    D=[]; A=[]; weight=[]; count=np.zeros(len(rois),dtype=int)
+    for i,(grayROI,binaryROI,objContour) in enumerate(rois):
+        W,H=grayROI.shape
+        radius=min(W,H)/2
+        c0,c1=center_of_mass(grayROI)
+        Y,X=zernikeGrid(grayROI.shape)
+        pix=grayROI.ravel()
+        Yn=(Y-c0)/radius
+        Xn=(X-c1)/radius
+        Dn=np.sqrt(Xn**2+Yn**2)
+        np.maximum(Dn,1e-9,out=Dn)
+        k=(Dn<=1.)&(pix>0)
+        frac=pix[k].astype(np.double)
+        frac/=frac.sum()
+        D.append(Dn[k]); A.append((Xn[k]-1j*Yn[k])/Dn[k]); weight.append(frac); count[i]=len(frac)
+    z=np.zeros((len(rois),len(nArr)))
+    if count.sum()>0:
+        D=np.concatenate(D); A=np.concatenate(A); weight=np.concatenate(weight)
+        powers=np.arange(degree+1)[:,None]
+        R=coef@(D[None,:]**powers)                  # radial polynomial of every moment at every pixel
+        terms=R*(A[None,:]**powers)[lArr]*weight    # moment j of pixel p
+        nonEmpty=count>0
+        starts=np.r_[0,np.cumsum(count)[:-1]][nonEmpty]
+        z[nonEmpty]=np.abs(np.add.reduceat(terms,starts,axis=1)).T*(nArr+1)/np.pi
+    z[:,0]=z[:,1:].sum(axis=1)  # first Zernike moment always constant so replace with sum
+    return(z)
+
+def histBatch(rois):
+    # 255 bin gray histogram of every ROI with one bincount, statistics along each row
+    bins=255
+    gray=np.concatenate([grayROI.ravel() for (grayROI,binaryROI,objContour) in rois]).astype(np.intp)
+    roi=np.repeat(np.arange(len(rois)),[grayROI.size for (grayROI,binaryROI,objContour) in rois])
+    histogram=np.bincount(roi*(bins+1)+gray,minlength=len(rois)*(bins+1)).reshape(len(rois),bins+1)
+    histogram=histogram[:,:bins].astype(np.float32)  # calcHist range [0,255) leaves out 255
+    grayHist=np.zeros((len(rois),5))
+    grayHist[:,0]=histogram.mean(axis=1)
+    grayHist[:,1]=histogram.std(axis=1)
+    grayHist[:,2]=skew(histogram,axis=1)
+    grayHist[:,3]=kurtosis(histogram,axis=1)
+    histNorm=histogram/histogram.max(axis=1,keepdims=True)
+    grayHist[:,4]=entropy(histNorm,axis=1)
+    return(grayHist)
+
+_lbpOffsets={}          # (points,radius) -> row and column offset of every sampling point
+MAX_LBP_STACK_RATIO=2   # stacked image area / ROI area above which ROIs are done one at a time (a stacked pixel costs about half a skimage pixel)
+
+def lbpOffsets(points, radius):
+    # sampling points on the circle, rounded like skimage
+    if (points,radius) not in _lbpOffsets:
+        angle=2*np.pi*np.arange(points,dtype=np.double)/points
+        _lbpOffsets[(points,radius)]=(np.round(-radius*np.sin(angle),5),np.round(radius*np.cos(angle),5))
+    return(_lbpOffsets[(points,radius)])
+
+def lbpBatch(rois, radius=8):
+    # uniform LBP histogram (same as lbpFeatures) of every ROI
+    # ROIs are stacked in one image separated by zero rows wider than the sampling circle, which is what skimage
+    # samples outside an image, so every sampling point is interpolated once for all ROIs
+    eps=1e-7
+    points=8*radius
+    pad=int(math.ceil(radius))+1
+    heights=np.array([grayROI.shape[0] for (grayROI,binaryROI,objContour) in rois])
+    widths=np.array([grayROI.shape[1] for (grayROI,binaryROI,objContour) in rois])
+    tops=pad+np.r_[0,np.cumsum(heights+pad)[:-1]]
+    stackShape=(tops[-1]+heights[-1]+pad,widths.max()+2*pad)
+    if stackShape[0]*stackShape[1]>MAX_LBP_STACK_RATIO*np.sum(heights*widths):
+        # mostly padding (small or very different sized ROIs), skimage is faster one ROI at a time
+        return(np.array([lbpFeatures(*roi) for roi in rois]))
+    stackIM=np.zeros(stackShape)
+    for (grayROI,binaryROI,objContour),top in zip(rois,tops):
+        stackIM[top:top+grayROI.shape[0],pad:pad+grayROI.shape[1]]=grayROI
+    rowIndex=np.arange(len(stackIM))
+    colIndex=np.arange(stackIM.shape[1])
+    localRow=(rowIndex-tops[(np.searchsorted(tops,rowIndex,side='right')-1).clip(0)]).astype(np.double) # row within its ROI
+    localCol=(colIndex-pad).astype(np.double)
+    image=stackIM[pad:-pad,pad:-pad]
+    rowOffset,colOffset=lbpOffsets(points,radius)
+    ones=np.zeros(image.shape,dtype=np.int32)
+    changes=np.zeros(image.shape,dtype=np.int32)
+    previous=None
+    for i in range(points):
+        # bilinear interpolation with the same arithmetic as skimage, in ROI coordinates so the weights match exactly
+        r=localRow[pad:-pad]+rowOffset[i]; c=localCol[pad:-pad]+colOffset[i]
+        minR=np.floor(r); maxR=np.ceil(r); minC=np.floor(c); maxC=np.ceil(c)
+        dr=(r-minR)[:,None]; dc=(c-minC)[None,:]
+        r0=rowIndex[pad:-pad]+(minR-localRow[pad:-pad]).astype(int); r1=r0+(maxR-minR).astype(int)
+        c0=colIndex[pad:-pad]+(minC-localCol[pad:-pad]).astype(int); c1=c0+(maxC-minC).astype(int)
+        top=(1-dc)*shiftedIM(stackIM,r0,c0)+dc*shiftedIM(stackIM,r0,c1)
+        bottom=(1-dc)*shiftedIM(stackIM,r1,c0)+dc*shiftedIM(stackIM,r1,c1)
+        signed=((1-dr)*top+dr*bottom-image)>=0
+        ones+=signed
+        if previous is not None:
+            changes+=signed!=previous
+        previous=signed
+    lbp=np.where(changes<=2,ones,points+1)  # uniform patterns are labeled by their number of ones, the rest points+1
+    lbpHist=np.zeros((len(rois),8))
+    for i,(top,h,w) in enumerate(zip(tops-pad,heights,widths)):
+        hist=np.bincount(lbp[top:top+h,:w].ravel(),minlength=points+2).astype("float")
+        hist=hist/(hist.sum()+eps)
+        lbpHist[i,:6]=hist[0:6]            # take the first 6 values and last 2 values, the rest are usually 0
+        lbpHist[i,6:]=hist[-2:]
+    return(lbpHist)
+
+def shiftedIM(im, rows, cols):
+    # im[rows][:,cols], a view when the indexes are consecutive (they usually are)
+    if rows[-1]-rows[0]==len(rows)-1 and cols[-1]-cols[0]==len(cols)-1:
+        return(im[rows[0]:rows[-1]+1,cols[0]:cols[-1]+1])
+    return(im[rows[:,None],cols[None,:]])
+
+FEATURE_BATCH={'zernike':zernikeBatch,'hist':histBatch,'lbp':lbpBatch} # groups with a batch function, the rest loop over the ROIs
+
+def getFeaturesBatch(rois, groups=None, out=None):
+    # features of many ROIs, rois is a list of (grayROI, binaryROI, objContour)
+    # returns a numpy array (len(rois) x C.MAX_FEATURE_VECTOR), written into out if given (e.g. a slice of the object table)
+    if groups is None:
+        groups=FEATURE_GROUPS
+    if out is None:
+        out=np.zeros((len(rois),C.MAX_FEATURE_VECTOR))
+    if len(rois)==0:
+        return(out)
+    for name in checkGroups(groups):
+        (function,columns)=FEATURE_GROUPS[name]
+        start=FEATURE_OFFSET[name]
+        with P.stage('feature '+name):
+            if name in FEATURE_BATCH:
+                out[:,start:start+len(columns)]=FEATURE_BATCH[name](rois)
             else:
-                lagIndex=oi-C.SPEED_WINDOW    # speed calculated as distance between current location and location SPEED_WINDOW frames ago
-                dx=oc[oi,C.XC]-oc[lagIndex,C.XC]
-                dy=oc[oi,C.YC]-oc[lagIndex,C.YC]
-                speed=math.sqrt(dx*dx+dy*dy)
-                oc[oi,C.SPEED]=speed
-        #print('oi',oi,'ID',myID,'startIndex',startIndex,'speed',speed)
+                for i,(grayROI,binaryROI,objContour) in enumerate(rois):
+                    out[i,start:start+len(columns)]=function(grayROI, binaryROI, objContour)
+    return(out)
+
+def getHeader(groups=None):
+    # header line of an object file with every column name, followed by a line listing the feature groups computed
+    # (np.savetxt puts # in front of both lines so np.loadtxt skips them)
+    if groups is None:
+        groups=FEATURE_GROUPS
+    featureColumns=[]
+    for name,(function,columns) in FEATURE_GROUPS.items():
+        featureColumns+=columns
+    header=C.objectHeader+','+','.join(featureColumns)+',zDepth,pca1,pca2,pca3'
+    return(header+'\nfeatureGroups='+','.join(checkGroups(groups)))
+
+def calcSpeed(obj,kinematics=False):
+    # speed calculated as distance between two points separated by SPEED_WINDOW frames
+    # obj is a numpy array or an ObjectTable
+    # if kinematics, also returns a per track array with columns C.KIN_TRACK_ID ... C.MAX_KIN_COL
+    obj=np.asarray(obj)
+    oc=obj[np.lexsort((obj[:,C.FRAME],obj[:,C.TRACK_ID]))] # sort by ID then FRAME
+    n=len(oc)
+    index=np.arange(n)
+    newID=np.ones(n,dtype=bool)                 # true where a new ID starts
+    newID[1:]=oc[1:,C.TRACK_ID]!=oc[:-1,C.TRACK_ID]
+    startIndex=np.maximum.accumulate(np.where(newID,index,0)) # location of first obj of each row's ID
+
+    # speed calculated as distance between current location and location SPEED_WINDOW frames ago
+    # zero until the window has been reached
+    valid=index-startIndex>C.SPEED_WINDOW
+    lagIndex=np.maximum(index-C.SPEED_WINDOW,0)
+    dx=oc[:,C.XC]-oc[lagIndex,C.XC]
+    dy=oc[:,C.YC]-oc[lagIndex,C.YC]
+    oc[:,C.SPEED]=np.where(valid,np.sqrt(dx*dx+dy*dy),0)
+    if kinematics:
+        kin=calcKinematics(oc,newID)
+
     # resort oc by frame
     oc=oc[oc[:,C.FRAME].argsort()]     # sort obj by frame count
+    if kinematics:
+        return(oc,kin)
     return(oc)
+
+def calcKinematics(oc,newID):
+    # per track path length, mean speed (pixels/frame), heading of net displacement (degrees) and
+    # tortuosity (path length / net displacement, 0 if the track did not move)
+    # oc is sorted by ID then FRAME, newID marks the first row of each ID
+    starts=np.flatnonzero(newID)
+    ends=np.r_[starts[1:],len(oc)]-1
+    kin=np.zeros((len(starts),C.MAX_KIN_COL))
+    if len(oc)==0:
+        return(kin)
+    step=np.zeros(len(oc))                      # distance moved since the previous row of the same ID
+    step[1:]=np.sqrt(np.diff(oc[:,C.XC])**2+np.diff(oc[:,C.YC])**2)
+    step[newID]=0
+    pathLength=np.add.reduceat(step,starts)
+    dx=oc[ends,C.XC]-oc[starts,C.XC]
+    dy=oc[ends,C.YC]-oc[starts,C.YC]
+    net=np.sqrt(dx*dx+dy*dy)
+    frames=oc[ends,C.FRAME]-oc[starts,C.FRAME]
+    kin[:,C.KIN_TRACK_ID]=oc[starts,C.TRACK_ID]
+    kin[:,C.KIN_POINTS]=ends-starts+1
+    kin[:,C.KIN_PATH_LENGTH]=pathLength
+    kin[:,C.KIN_MEAN_SPEED]=np.divide(pathLength,frames,out=np.zeros(len(starts)),where=frames>0)
+    kin[:,C.KIN_HEADING]=np.degrees(np.arctan2(dy,dx))
+    kin[:,C.KIN_TORTUOSITY]=np.divide(pathLength,net,out=np.zeros(len(starts)),where=net>0)
+    return(kin)
@@ -0,0 +1,85 @@
+# Automatic focus, finds the reconstruction distance z where an object is sharpest
+# V3 10.18.26 METRIC comment gives the measured goldHolo.zip error
+# V2 10.18.26 crop is padded to a fast FFT size like vc.recoFrame (pad, apodize)
+# V1 10.18.26
+#
+# Searches z coarse-to-fine: a coarse grid over [zMin,zMax] reconstructed as one batch,
+# then a golden-section search around the best grid point. The forward FFT of the crop is
+# computed once and shared by every z that is tried.
+#
+# Thomas Zimmerman IBM Research-Almaden, Center for Cellular Construction (https://ccc.ucsf.edu/) 
+# This work is funded by the National Science Foundation (NSF) grant No. DBI-1548297 
+# Disclaimer:  Any opinions, findings and conclusions or recommendations expressed in this material are those of the authors and do not necessarily reflect the views of the National Science Foundation.
+
+import numpy as np
+import cv2
+import reco as vc
+
+# search settings, z in meters
+MIN_Z=500e-6        # closest object distance to the image sensor, raw fringes look sharp near z=0
+MAX_Z=8000e-6       # farthest object distance to the image sensor
+COARSE_STEPS=32     # number of coarse z intervals
+TOLERANCE=10e-6     # golden-section search stops when the z interval is smaller than this
+METRIC='gradient'   # best match to the hand focused goldHolo.zip images: median |autoFocus z - z in the file name| 225 um over its 64 images
+BORDER=8            # ignore 1/BORDER of the crop on each side, FFT wrap-around fringes live there
+GOLDEN=(np.sqrt(5)-1)/2
+
+######## sharpness metrics of the amplitude image, larger is sharper ########
+def varLaplacian(im):
+    # variance of the Laplacian, high for sharp edges
+    return(float(cv2.Laplacian(im,cv2.CV_32F).var()))
+
+def tamura(im):
+    # Tamura coefficient sqrt(std/mean)
+    mean=im.mean()
+    if mean==0:
+        return(0)
+    return(np.sqrt(im.std()/mean))
+
+def gradient(im):
+    # Tenengrad, mean squared Sobel gradient magnitude
+    gx=cv2.Sobel(im,cv2.CV_32F,1,0)
+    gy=cv2.Sobel(im,cv2.CV_32F,0,1)
+    return(float(np.mean(gx*gx+gy*gy)))
+
+METRICS={'varLaplacian':varLaplacian,'tamura':tamura,'gradient':gradient}
+
+def autoFocus(cropIM, zMin=MIN_Z, zMax=MAX_Z, metric=METRIC, coarseSteps=COARSE_STEPS, tolerance=TOLERANCE, wvlen=vc.WVLEN, dxy=vc.DXY, pad=vc.PAD_MODE, apodize=vc.APODIZE):
+    # returns (bestZ, focusIM, score) where focusIM is the uint8 reconstruction at bestZ, same as vc.recoFrame
+    score=METRICS[metric]
+    (amplitude,back)=vc.padCrop(np.sqrt(cropIM),pad,apodize)
+    E0=vc.engine.spectrum(amplitude)
+    M,N=cropIM.shape[:2]
+    (top,left)=(back[0].start,back[1].start)
+    center=(slice(top+M//BORDER,top+M-M//BORDER),slice(left+N//BORDER,left+N-N//BORDER)) # region of the crop the metric is evaluated on
+    scores={}                   # z -> sharpness, so no z is reconstructed twice
+
+    def sharpness(res):
+        return(score(np.abs(res[center]).astype('float32')))
+
+    def focus(z):
+        if z not in scores:
+            scores[z]=sharpness(vc.engine.propagateSpectrum(E0, wvlen, z, dxy))
+        return(scores[z])
+
+    # coarse search, all grid points in one batch
+    zGrid=list(np.linspace(zMin,zMax,coarseSteps+1))
+    chunk=vc.stackChunk(*E0.shape)
+    for start in range(0,len(zGrid),chunk):
+        res=vc.engine.propagateStack(E0, wvlen, zGrid[start:start+chunk], dxy)
+        for i in range(len(res)):
+            scores[zGrid[start+i]]=sharpness(res[i])
+    best=int(np.argmax([scores[z] for z in zGrid]))
+
+    # fine search, golden-section between the neighbours of the best grid point
+    a=zGrid[max(best-1,0)]; b=zGrid[min(best+1,len(zGrid)-1)]
+    c=b-GOLDEN*(b-a); d=a+GOLDEN*(b-a)
+    while b-a>tolerance:
+        if focus(c)>focus(d):
+            b=d; d=c; c=b-GOLDEN*(b-a)
+        else:
+            a=c; c=d; d=a+GOLDEN*(b-a)
+    bestZ=max(scores,key=scores.get)
+    res=vc.engine.propagateSpectrum(E0, wvlen, bestZ, dxy)
+    focusIM=(np.abs(res[back])**2).astype('uint8') # same as vc.recoFrame
+    return(bestZ,focusIM,scores[bestZ])
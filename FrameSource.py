@@ -0,0 +1,91 @@
+# Threaded video reader, decodes frames on a background thread so decoding overlaps processing
+# V3 Oct 18, 2026 the decode thread always queues the end of the video, an exception in it is raised by read()
+# V2 Oct 18, 2026 exact=True reaches the start frame by grabbing instead of seeking
+# V1 Oct 18, 2026
+#
+# FrameSource is used like cv2.VideoCapture (isOpened, read, get, release). A thread reads
+# frames into a bounded queue of QUEUE_SIZE frames. skip=N drops N frames after every frame
+# read using grab(), which does not convert or copy them, and never seeks.
+# After read(), frameIndex and timestamp (msec) describe the frame returned. If decoding raises an exception,
+# read() raises it instead of waiting for a frame that never comes.
+# Seeking to start can land on a nearby keyframe with some codecs, exact=True grabs the frames
+# before start instead (slower, but frame start is always the first frame returned).
+#
+# Thomas Zimmerman IBM Research-Almaden, Center for Cellular Construction (https://ccc.ucsf.edu/) 
+# This work is funded by the National Science Foundation (NSF) grant No. DBI-1548297 
+# Disclaimer:  Any opinions, findings and conclusions or recommendations expressed in this material are those of the authors and do not necessarily reflect the views of the National Science Foundation.
+
+import cv2
+import threading
+import queue
+
+QUEUE_SIZE=8    # decoded frames buffered ahead of processing
+
+class FrameSource:
+    def __init__(self, vid, start=0, skip=0, queueSize=QUEUE_SIZE, exact=False):
+        self.cap=cv2.VideoCapture(vid)
+        if start and exact:
+            for i in range(start):
+                self.cap.grab()
+        elif start:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, start) # one seek to the starting frame
+        self.skip=skip
+        self.frameIndex=start-1     # index of the last frame returned by read()
+        self.timestamp=0            # time of the last frame returned by read(), msec
+        self.done=False             # true after read() returned the end of the video
+        self.error=None             # exception raised in the decode thread, raised again by read()
+        self.stop=threading.Event()
+        self.frames=queue.Queue(maxsize=max(1,queueSize))
+        self.thread=threading.Thread(target=self.decode, args=(start,), daemon=True)
+        self.thread.start()
+
+    def put(self, item):
+        # queue an item, gives up when release() stops the thread
+        while not self.stop.is_set():
+            try:
+                self.frames.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def decode(self, index):
+        # background thread, puts (ret, frameIndex, timestamp, frame) in the queue and always ends with ret False
+        try:
+            while not self.stop.is_set():
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+                self.put((ret, index, self.cap.get(cv2.CAP_PROP_POS_MSEC), frame))
+                index+=1
+                for s in range(self.skip):
+                    if not self.cap.grab():
+                        break
+                    index+=1
+        except Exception as e:
+            self.error=e    # raised by read()
+        finally:
+            self.put((False, index, 0, None))   # end marker, so read() never waits on a dead thread
+
+    def isOpened(self):
+        return(self.cap.isOpened() and not self.done)
+
+    def read(self):
+        if self.done:
+            return(False, None)
+        ret, index, timestamp, frame = self.frames.get()
+        if not ret:
+            self.done=True
+            if self.error is not None:
+                raise self.error
+            return(False, None)
+        self.frameIndex=index; self.timestamp=timestamp
+        return(ret, frame)
+
+    def get(self, prop):
+        # video properties such as cv2.CAP_PROP_FRAME_COUNT, not the read position (use frameIndex)
+        return(self.cap.get(prop))
+
+    def release(self):
+        self.stop.set()
+        self.thread.join()
+        self.cap.release()
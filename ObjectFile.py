@@ -0,0 +1,236 @@
+# Object file, binary columnar storage for detection, tracking and feature rows
+# V2 Oct 18, 2026 FrameIndex, rows of any frame without scanning, saved next to the object file
+# V1 Oct 18, 2026
+#
+# An object file is a directory name.cols holding
+#   meta.json    column names, dtype, number of rows and the header text of the CSV it replaces
+#   000.bin ...  one raw little-endian float64 file per column, in column order
+# Writers append rows to every column file. Readers memory map only the columns they ask for, so loading a few
+# columns of a large file touches only those, and values keep full precision (CSV with %f keeps 6 decimals).
+# load() and columnNames() also read CSV files written by np.savetxt, so programs work with either format.
+#
+# getFrameIndex(path) gives the rows of each frame number (an offset table built once with a binary search of the
+# frame column, then saved as frameIndex.npz in the .cols directory or name.csv.frameIndex.npz next to a CSV).
+#
+# convert CSV files:  python ObjectFile.py featureFile_2.csv FeaturesForConfusionMatrix.csv
+#
+# Thomas Zimmerman IBM Research-Almaden, Center for Cellular Construction (https://ccc.ucsf.edu/)
+# This work is funded by the National Science Foundation (NSF) grant No. DBI-1548297
+# Disclaimer:  Any opinions, findings and conclusions or recommendations expressed in this material are those of the authors and do not necessarily reflect the views of the National Science Foundation.
+
+import os
+import sys
+import json
+import numpy as np
+
+SUFFIX='.cols'      # object file directory name ends with this
+META='meta.json'
+DTYPE='<f8'
+FRAME_INDEX='frameIndex.npz'
+
+def isObjectFile(path):
+    return(path.lower().endswith(SUFFIX) or os.path.exists(os.path.join(path,META)))
+
+def columnFile(path,i):
+    return(os.path.join(path,'%03d.bin' % i))
+
+def headerColumns(header):
+    # column names from the first line of a header, e.g. Feature.getHeader()
+    return([name.strip() for name in header.split('\n')[0].lstrip('#').split(',')])
+
+class Writer:
+    # appends rows to an object file, columns is a list of names or a header string
+    def __init__(self, path, columns, header=None, append=False):
+        if isinstance(columns,str):
+            header=columns if header is None else header
+            columns=headerColumns(columns)
+        self.path=path
+        self.columns=list(columns)
+        self.header=header if header is not None else ','.join(self.columns)
+        os.makedirs(path,exist_ok=True)
+        self.files=[open(columnFile(path,i),'ab' if append else 'wb') for i in range(len(self.columns))]
+        self.rows=self.files[0].tell()//8 if append else 0
+        self.writeMeta()
+
+    def append(self, rows):
+        # rows is a 2D array with one column per object file column
+        rows=np.asarray(rows,dtype=DTYPE).reshape(-1,len(self.columns))
+        for i,f in enumerate(self.files):
+            f.write(np.ascontiguousarray(rows[:,i]).tobytes())
+        self.rows+=len(rows)
+        return(self.rows)
+
+    def truncate(self, rows):
+        # drop rows after the first rows, e.g. to continue from a checkpoint
+        for f in self.files:
+            f.flush()
+            f.truncate(rows*8)
+            f.seek(rows*8)
+        self.rows=rows
+        self.writeMeta()
+
+    def writeMeta(self):
+        meta={'columns':self.columns,'dtype':DTYPE,'rows':self.rows,'header':self.header}
+        tempName=os.path.join(self.path,META+'.tmp')
+        with open(tempName,'w') as f:
+            json.dump(meta,f,indent=1)
+        os.replace(tempName,os.path.join(self.path,META))
+
+    def flush(self):
+        for f in self.files:
+            f.flush()
+        self.writeMeta()
+
+    def close(self):
+        self.flush()
+        for f in self.files:
+            f.close()
+
+class ObjectFile:
+    # read side of an object file
+    def __init__(self, path):
+        self.path=path
+        with open(os.path.join(path,META)) as f:
+            meta=json.load(f)
+        self.columns=meta['columns']
+        self.rows=meta['rows']
+        self.header=meta.get('header',','.join(self.columns))
+        self.dtype=np.dtype(meta.get('dtype',DTYPE))
+
+    def __len__(self):
+        return(self.rows)
+
+    def index(self, column):
+        # column number of a name or number
+        if isinstance(column,str):
+            return(self.columns.index(column))
+        return(int(column))
+
+    def column(self, column):
+        # read only memory map of one column (name or number)
+        if self.rows==0:
+            return(np.zeros(0,dtype=self.dtype))
+        return(np.memmap(columnFile(self.path,self.index(column)),dtype=self.dtype,mode='r',shape=(self.rows,)))
+
+    def load(self, columns=None):
+        # 2D array (rows x columns), columns is a list of names or numbers, default all
+        if columns is None:
+            columns=range(len(self.columns))
+        out=np.empty((self.rows,len(columns)),dtype=self.dtype)
+        for j,column in enumerate(columns):
+            out[:,j]=self.column(column)
+        return(out)
+
+class FrameIndex:
+    # row numbers of each frame number. offsets[k]:offsets[k+1] are the rows of frame k in frame order, order maps
+    # them to file rows when the file isn't sorted by frame (None when it is)
+    def __init__(self, offsets, order=None):
+        self.offsets=offsets
+        self.order=order
+
+    @classmethod
+    def build(cls, frames):
+        # from the frame column
+        frames=np.asarray(frames)
+        order=None
+        if len(frames)>1 and np.any(frames[1:]<frames[:-1]):
+            order=np.argsort(frames,kind='stable')
+            frames=frames[order]
+        last=int(frames[-1]) if len(frames) else -1
+        offsets=np.searchsorted(frames,np.arange(last+2),side='left')  # first row of each frame number
+        return(cls(offsets,order))
+
+    def __len__(self):
+        # number of frames, 0 to the last frame with an object
+        return(len(self.offsets)-1)
+
+    def rows(self, frame):
+        # rows of frame as a slice (sorted file) or index array, empty if the frame has no objects
+        if frame<0 or frame>=len(self):
+            return(slice(0,0))
+        s=slice(int(self.offsets[frame]),int(self.offsets[frame+1]))
+        if self.order is not None:
+            return(self.order[s])
+        return(s)
+
+    def count(self, frame):
+        # number of objects in frame
+        if frame<0 or frame>=len(self):
+            return(0)
+        return(int(self.offsets[frame+1]-self.offsets[frame]))
+
+def frameIndexFile(path):
+    if isObjectFile(path):
+        return(os.path.join(path,FRAME_INDEX))
+    return(path+'.'+FRAME_INDEX)
+
+def getFrameIndex(path, frameColumn=0):
+    # FrameIndex of an object file or CSV, loaded if saved after the file last changed, else built and saved
+    # frameColumn is the name or number of the frame column
+    dataFile=os.path.join(path,META) if isObjectFile(path) else path
+    indexFile=frameIndexFile(path)
+    if os.path.exists(indexFile) and os.path.getmtime(indexFile)>=os.path.getmtime(dataFile):
+        with np.load(indexFile) as data:
+            if str(data['frameColumn'])==str(frameColumn):
+                return(FrameIndex(data['offsets'],data['order'] if 'order' in data.files else None))
+    index=FrameIndex.build(load(path,[frameColumn])[:,0])
+    saved={'offsets':index.offsets,'frameColumn':str(frameColumn)}
+    if index.order is not None:
+        saved['order']=index.order
+    try:
+        with open(indexFile,'wb') as f:
+            np.savez(f,**saved)
+    except OSError:
+        pass    # read only folder, build it again next time
+    return(index)
+
+def columnNames(path):
+    # names of the columns of an object file or of a CSV file with a # header line
+    if isObjectFile(path):
+        return(ObjectFile(path).columns)
+    with open(path) as f:
+        return(headerColumns(f.readline()))
+
+def load(path, columns=None):
+    # rows of an object file or CSV file as a 2D array, columns is a list of names or numbers, default all
+    if isObjectFile(path):
+        return(ObjectFile(path).load(columns))
+    if columns is not None:
+        names=columnNames(path)
+        columns=[names.index(c) if isinstance(c,str) else int(c) for c in columns]
+    return(np.loadtxt(path,delimiter=',',usecols=columns,ndmin=2))    # header lines start with # so are skipped
+
+def save(path, array, header):
+    # whole array to an object file (path ends with SUFFIX) or CSV, header is the column names line(s)
+    if isObjectFile(path):
+        w=Writer(path,header)
+        w.append(array)
+        w.close()
+    else:
+        np.savetxt(path,array,header=header,fmt='%f',delimiter=',') # saves numpy array as a csv file
+
+def convert(csvFile, path=None):
+    # CSV object file to an object file, returns its path. Columns are named from the # header line,
+    # col_0, col_1, ... if it doesn't have one per column
+    if path is None:
+        path=os.path.splitext(csvFile)[0]+SUFFIX
+    array=np.loadtxt(csvFile,delimiter=',',ndmin=2)
+    with open(csvFile) as f:
+        header=''
+        for line in f:
+            if not line.startswith('#'):
+                break
+            header+=line[1:].strip()+'\n'
+    header=header.strip()
+    columns=headerColumns(header) if header else []
+    if len(columns)!=array.shape[1]:
+        columns=['col_%d' % i for i in range(array.shape[1])]
+    w=Writer(path,columns,header if header else None)
+    w.append(array)
+    w.close()
+    return(path)
+
+if __name__=='__main__':
+    for csvFile in sys.argv[1:]:
+        path=convert(csvFile)
+        print('converted',csvFile,'to',path,len(ObjectFile(path)),'rows')
@@ -0,0 +1,50 @@
+# Growable object table, replaces np.append of one row per object
+# V2 Oct 18, 2026 discard() drops rows that have been written out
+# V1 Oct 18, 2026
+#
+# Rows live in a preallocated buffer whose capacity doubles when full, so adding an object
+# is O(1) amortized instead of copying the whole array. Columns are the Common pointers
+# (C.FRAME, C.TRACK_ID, ... C.MAX_OBJ_COL). The filled rows are a numpy view, so code that
+# indexes objectArray (Track.trackObject, Feature.calcSpeed) works on it unchanged.
+#
+# Thomas Zimmerman IBM Research-Almaden, Center for Cellular Construction (https://ccc.ucsf.edu/) 
+# This work is funded by the National Science Foundation (NSF) grant No. DBI-1548297 
+# Disclaimer:  Any opinions, findings and conclusions or recommendations expressed in this material are those of the authors and do not necessarily reflect the views of the National Science Foundation.
+
+import numpy as np
+import Common as C  # constants used by all programs
+
+START_CAPACITY=1024     # rows allocated before the first doubling
+
+class ObjectTable:
+    def __init__(self, cols=C.MAX_OBJ_COL, capacity=START_CAPACITY):
+        self.data=np.zeros((max(1,capacity),cols), dtype='float')
+        self.count=0    # number of rows in use
+
+    def addRow(self):
+        # append a row of zeros, returns its index
+        if self.count==len(self.data):
+            bigger=np.zeros((2*len(self.data),self.data.shape[1]), dtype=self.data.dtype)
+            bigger[:self.count]=self.data
+            self.data=bigger
+        oi=self.count
+        self.data[oi]=0
+        self.count+=1
+        return(oi)
+
+    def discard(self, n):
+        # remove the first n rows (e.g. saved to a checkpoint), row i becomes row i-n
+        n=min(n,self.count)
+        self.data[:self.count-n]=self.data[n:self.count]
+        self.count-=n
+
+    @property
+    def rows(self):
+        # view of the rows in use, becomes stale when addRow grows the buffer so get it again after adding
+        return(self.data[:self.count])
+
+    def __len__(self):
+        return(self.count)
+
+    def __array__(self, dtype=None, copy=None):
+        return(np.asarray(self.rows, dtype=dtype))
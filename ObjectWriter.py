@@ -0,0 +1,97 @@
+# Streaming object file writer, memory bounded by the objects being tracked instead of the length of the video
+# V2 Oct 18, 2026 writes binary object files (ObjectFile, name ends with .cols) as well as CSV
+# V1 Oct 18, 2026
+#
+# Detect hands over the rows of each frame once they are tracked. Speed only needs the track's positions
+# SPEED_WINDOW objects back and the tracker only matches against the previous frame, so a row is final as soon
+# as its frame is tracked: speed is computed from the last SPEED_WINDOW positions kept per live track (same value
+# as Feature.calcSpeed), rows with NaN features or speed <= MIN_SPEED are dropped, and the rest are written
+# immediately, to an ObjectFile if fileName ends with .cols otherwise in the format of np.savetxt(fmt='%f',delimiter=',').
+# A track not seen in the last frame can't be continued, so its positions are forgotten.
+# Rows are in frame order, by track ID within a frame.
+#
+# Thomas Zimmerman IBM Research-Almaden, Center for Cellular Construction (https://ccc.ucsf.edu/)
+# This work is funded by the National Science Foundation (NSF) grant No. DBI-1548297
+# Disclaimer:  Any opinions, findings and conclusions or recommendations expressed in this material are those of the authors and do not necessarily reflect the views of the National Science Foundation.
+
+import os
+import math
+import numpy as np
+import Common as C  # constants used by all programs
+import ObjectFile as OF
+
+class ObjectWriter:
+    def __init__(self, fileName, header, cols=C.MAX_OBJ_COL, state=None):
+        # state from getState() continues a file after a restart, rows written after it are removed
+        self.fileName=fileName
+        self.rowFormat=','.join(['%f']*cols)+os.linesep    # np.savetxt writes text mode lines
+        self.tracks={}      # track ID -> (objects in track so far, list of the last SPEED_WINDOW (xc,yc))
+        self.count=0        # rows written
+        self.seen=0         # rows received, before NaN and speed reject
+        self.file=None      # CSV file
+        self.objectFile=None
+        if OF.isObjectFile(fileName):
+            self.objectFile=OF.Writer(fileName,header,append=state is not None)
+            if state is not None:
+                self.objectFile.truncate(int(state['offset']))
+        elif state is None:
+            self.file=open(fileName,'wb')
+            self.file.write(('# '+header.replace('\n','\n# ')+os.linesep).encode())   # same header lines as np.savetxt
+        else:
+            self.file=open(fileName,'r+b')
+            self.file.truncate(int(state['offset']))
+            self.file.seek(int(state['offset']))
+        if state is not None:
+            self.count=int(state['count']); self.seen=int(state['seen'])
+            for objID,n,p in zip(state['ids'],state['n'],state['positions']):
+                self.tracks[objID]=(int(n),[tuple(xy) for xy in p[:min(int(n),C.SPEED_WINDOW)]])
+
+    def addFrame(self, rows):
+        # rows of one frame after tracking, SPEED is filled in and the rows that pass are written
+        rows=rows[np.argsort(rows[:,C.TRACK_ID],kind='stable')]
+        tracks={}
+        for row in rows:
+            objID=row[C.TRACK_ID]
+            (n,positions)=self.tracks.get(objID,(0,[]))
+            if n>C.SPEED_WINDOW:    # distance moved since SPEED_WINDOW objects ago, zero until the window is reached
+                (x,y)=positions[0]
+                dx=row[C.XC]-x; dy=row[C.YC]-y
+                row[C.SPEED]=math.sqrt(dx*dx+dy*dy)
+            else:
+                row[C.SPEED]=0
+            positions.append((row[C.XC],row[C.YC]))
+            if len(positions)>C.SPEED_WINDOW:
+                del positions[0]
+            tracks[objID]=(n+1,positions)
+        self.tracks=tracks  # tracks not in this frame have ended
+        self.seen+=len(rows)
+        keep=rows[~np.isnan(rows).any(axis=1) & (rows[:,C.SPEED]>C.MIN_SPEED)] # remove obj with NaN features or moving too slow
+        if self.objectFile is not None:
+            self.objectFile.append(keep)
+        else:
+            self.file.write(''.join([self.rowFormat % tuple(row) for row in keep]).encode())
+        self.count+=len(keep)
+        return(len(keep))
+
+    def getState(self):
+        # everything needed to continue writing after a restart, {name:array}
+        ids=np.array(list(self.tracks.keys()),dtype='float')
+        n=np.array([self.tracks[objID][0] for objID in self.tracks],dtype='int64')
+        positions=np.full((len(ids),C.SPEED_WINDOW,2),np.nan)
+        for i,objID in enumerate(self.tracks):
+            p=self.tracks[objID][1]
+            if len(p):
+                positions[i,:len(p)]=p
+        if self.objectFile is not None:
+            self.objectFile.flush()
+            offset=self.objectFile.rows     # rows for an object file, bytes for CSV
+        else:
+            self.file.flush()
+            offset=self.file.tell()
+        return({'offset':offset,'count':self.count,'seen':self.seen,'ids':ids,'n':n,'positions':positions})
+
+    def close(self):
+        if self.objectFile is not None:
+            self.objectFile.close()
+        else:
+            self.file.close()
@@ -0,0 +1,120 @@
+# PROFILING
+# Wall time and call count of each stage of the detect, track, feature pipeline
+# V1 18 Oct 2026
+#
+# usage:
+#   with P.stage('blur'):
+#       blurIM=cv2.medianBlur(grayIM,C.BLUR)
+# C.PROFILE=0 costs one function call per stage, 1 keeps totals per stage, 2 also keeps every call for a trace
+# print(P.summary()) at the end of a run, P.writeTrace('run.json') opens in chrome://tracing or https://ui.perfetto.dev,
+# P.writeTrace('run.csv') gives one row per call
+#
+# Thomas Zimmerman IBM Research-Almaden, Center for Cellular Construction (https://ccc.ucsf.edu/)
+# This work is funded by the National Science Foundation (NSF) grant No. DBI-1548297
+# Disclaimer:  Any opinions, findings and conclusions or recommendations expressed in this material are those of the authors and do not necessarily reflect the views of the National Science Foundation.
+
+import time
+import json
+import os
+import threading
+import Common as C
+
+stats={}        # stage name -> [calls, total seconds, max seconds]
+trace=[]        # (stage, frame, start seconds, duration seconds, process id, thread id) when C.PROFILE>1
+frame=-1        # frame being processed, stored with each trace entry
+startTime=time.perf_counter()   # wall time of the run starts here, see reset()
+
+class Stage:
+    # times the code inside a with block
+    __slots__=('name','t0')
+    def __init__(self,name):
+        self.name=name
+    def __enter__(self):
+        self.t0=time.perf_counter()
+        return(self)
+    def __exit__(self,*exc):
+        record(self.name,self.t0,time.perf_counter()-self.t0)
+        return(False)
+
+class NoStage:
+    # stand in for Stage when profiling is off
+    __slots__=()
+    def __enter__(self):
+        return(self)
+    def __exit__(self,*exc):
+        return(False)
+
+NO_STAGE=NoStage()
+
+def stage(name):
+    if not C.PROFILE:
+        return(NO_STAGE)
+    return(Stage(name))
+
+def record(name,start,duration):
+    # add one call of a stage, start is time.perf_counter() when it began
+    s=stats.get(name)
+    if s is None:
+        stats[name]=[1,duration,duration]
+    else:
+        s[0]+=1
+        s[1]+=duration
+        if duration>s[2]:
+            s[2]=duration
+    if C.PROFILE>1:
+        trace.append((name,frame,start,duration,os.getpid(),threading.get_ident()))
+
+def setFrame(frameCount):
+    global frame
+    frame=frameCount
+
+def reset():
+    # start a new run
+    global startTime,frame
+    stats.clear()
+    trace.clear()
+    frame=-1
+    startTime=time.perf_counter()
+
+def collect():
+    # returns the stages recorded since the last collect and clears them, used to send a worker's stages to the main process
+    result=({name:list(s) for name,s in stats.items()},list(trace))
+    stats.clear()
+    trace.clear()
+    return(result)
+
+def merge(collected):
+    # add stages from collect() (e.g. run in a worker process)
+    (workerStats,workerTrace)=collected
+    for name,(calls,total,maxTime) in workerStats.items():
+        s=stats.get(name)
+        if s is None:
+            stats[name]=[calls,total,maxTime]
+        else:
+            s[0]+=calls
+            s[1]+=total
+            s[2]=max(s[2],maxTime)
+    trace.extend(workerTrace)
+
+def summary():
+    # table of stages sorted by total time. Stages are nested (e.g. feature groups inside features) and stages run in
+    # worker processes overlap, so the % column does not add up to 100
+    wall=time.perf_counter()-startTime
+    lines=['%-24s %8s %10s %10s %10s %7s' % ('stage','calls','total s','mean ms','max ms','% wall')]
+    for name,(calls,total,maxTime) in sorted(stats.items(),key=lambda item:-item[1][1]):
+        lines.append('%-24s %8d %10.3f %10.3f %10.3f %7.1f' % (name,calls,total,1000*total/calls,1000*maxTime,100*total/wall))
+    lines.append('wall time %.3f s' % wall)
+    return('\n'.join(lines))
+
+def writeTrace(fileName):
+    # every recorded call (C.PROFILE=2), Chrome trace event JSON if fileName ends with .json else CSV
+    if fileName.lower().endswith('.json'):
+        events=[{'name':name,'ph':'X','ts':1e6*(start-startTime),'dur':1e6*duration,'pid':pid,'tid':tid,'args':{'frame':frameCount}}
+                for (name,frameCount,start,duration,pid,tid) in trace]
+        with open(fileName,'w') as f:
+            json.dump({'traceEvents':events,'displayTimeUnit':'ms'},f)
+    else:
+        with open(fileName,'w') as f:
+            f.write('stage,frame,start,duration,pid,tid\n')
+            for (name,frameCount,start,duration,pid,tid) in trace:
+                f.write('%s,%d,%.6f,%.6f,%d,%d\n' % (name,frameCount,start-startTime,duration,pid,tid))
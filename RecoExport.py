@@ -0,0 +1,156 @@
+# RECONSTRUCTION EXPORT
+# Reconstructs every tracked object of an object file and saves the images, e.g. to build a classifier training set like goldHolo.zip
+# V3 18 Oct 2026 trackZ keeps only each track's z once its focus is done, not the focus image
+# V2 18 Oct 2026 crop centered on the middle of the box (Detect's XC,YC are not the box center), autofocus image reused, cropCheck
+# V1 18 Oct 2026
+#
+# examples:
+#   python RecoExport.py M3.mp4 M3.cols -o M3_reco                  (each track focused once, on its first object)
+#   python RecoExport.py M3.mp4 M3.cols -o M3_reco --focus object   (every object focused)
+#   python RecoExport.py M3.mp4 M3.cols -o M3_reco --focus none --z 640
+# The object file is from Detect or Batch (.cols or CSV). Its rows are grouped by frame (ObjectFile.getFrameIndex) so
+# each frame with objects is decoded once, in order, without seeking. Each object's ROI is enlarged by --pad pixels on
+# every side for its fringes, grown to an even FFT friendly size (reco.fftSize) around the middle of the box
+# ((X0+X1)/2,(Y0+Y1)/2), not the XC,YC columns) and kept inside the frame. Reconstruction and image writing run in --jobs threads.
+# Images are named like holoVideoReco SavePic: video_frame_xc_yc_z_holo.jpg and video_frame_xc_yc_z_raw.jpg,
+# z in microns.
+#
+# Thomas Zimmerman IBM Research-Almaden, Center for Cellular Construction (https://ccc.ucsf.edu/)
+# This work is funded by the National Science Foundation (NSF) grant No. DBI-1548297
+# Disclaimer:  Any opinions, findings and conclusions or recommendations expressed in this material are those of the authors and do not necessarily reflect the views of the National Science Foundation.
+
+import argparse
+import os
+import sys
+import time
+import collections
+import cv2
+from concurrent.futures import ThreadPoolExecutor
+import Common as C
+import ObjectFile as OF
+import Focus
+import reco as vc
+
+PAD=64              # pixels added on each side of an object ROI for its fringes
+Z_MICRONS=640       # reconstruction distance with --focus none, holoVideoReco starts at Z=64 (x10 um)
+FOCUS_MODES=('track','object','none')
+MAX_PENDING=4       # crops queued per thread, bounds memory when decoding is faster than reconstruction
+COLUMNS=[C.FRAME,C.TRACK_ID,C.X0,C.Y0,C.X1,C.Y1]
+
+def boxCenter(x0,y0,x1,y1):
+    # center of the box in whole pixels, used for the crop and the image name
+    return(int((x0+x1)//2),int((y0+y1)//2))
+
+def cropWindow(x0,y0,x1,y1,xRez,yRez,pad=PAD):
+    # [y0,y1,x0,x1] of an even FFT friendly window holding the ROI plus pad, centered on the box and inside the frame
+    (xc,yc)=boxCenter(x0,y0,x1,y1)
+    w=min(vc.fftSize(x1-x0+2*pad),xRez-xRez%2)
+    h=min(vc.fftSize(y1-y0+2*pad),yRez-yRez%2)
+    wx0=int(min(max(xc-w//2,0),xRez-w))
+    wy0=int(min(max(yc-h//2,0),yRez-h))
+    return([wy0,wy0+h,wx0,wx0+w])
+
+def cropCheck(objectFile,xRez,yRez,pad=PAD):
+    # test that every box of objectFile lies inside its crop window, returns the number of boxes outside
+    outside=0
+    for (f,trackID,x0,y0,x1,y1) in OF.load(objectFile,COLUMNS):
+        (wy0,wy1,wx0,wx1)=cropWindow(x0,y0,x1,y1,xRez,yRez,pad)
+        if x0<wx0 or y0<wy0 or x1>wx1 or y1>wy1:
+            outside+=1
+    print('cropCheck',objectFile,'boxes',len(OF.load(objectFile,[C.FRAME])),'outside their crop',outside)
+    return(outside)
+
+def imageName(outDir,name,frame,xc,yc,zMicrons,kind):
+    # same scheme as holoVideoReco savePicture
+    return(os.path.join(outDir,name+'_'+str(frame)+'_'+str(xc)+'_'+str(yc)+'_'+str(zMicrons)+'_'+kind+'.jpg'))
+
+def focusZ(cropIM):
+    # (bestZ,focusIM), focusIM is the reconstruction of cropIM at bestZ (same as vc.recoFrame)
+    (bestZ,focusIM,score)=Focus.autoFocus(cropIM)
+    return(bestZ,focusIM)
+
+def exportObject(cropIM,z,outDir,name,frame,xc,yc,focused=False):
+    # saves the raw crop and its reconstruction, z is meters or a future of focusZ
+    # focused means the future focused this cropIM, so its reconstruction is reused instead of computed again
+    holoIM=None
+    if not isinstance(z,float):
+        (z,focusIM)=z.result()
+        if focused:
+            holoIM=focusIM
+    if holoIM is None:
+        holoIM=vc.recoFrame(cropIM,z)
+    zMicrons=int(round(z*1e6))
+    cv2.imwrite(imageName(outDir,name,frame,xc,yc,zMicrons,'holo'),holoIM)
+    cv2.imwrite(imageName(outDir,name,frame,xc,yc,zMicrons,'raw'),cropIM)
+    return(zMicrons)
+
+def exportVideo(vid,objectFile,outDir=None,focus='track',zMicrons=Z_MICRONS,pad=PAD,jobs=1):
+    # returns number of objects exported
+    if focus not in FOCUS_MODES:
+        raise ValueError('focus must be one of '+', '.join(FOCUS_MODES))
+    if outDir is None:
+        outDir=os.path.dirname(vid)
+    os.makedirs(outDir or '.',exist_ok=True)
+    name=os.path.splitext(os.path.basename(vid))[0]
+    rows=OF.load(objectFile,COLUMNS)
+    frameIndex=OF.getFrameIndex(objectFile,C.FRAME)
+    cap=vc.openVid(vid)
+    if not cap.isOpened():
+        raise IOError('could not open video '+vid)
+    xRez=int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)); yRez=int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    trackZ={}       # track ID -> z (meters), a future of focusZ until it is done, with --focus track
+    pending=collections.deque()
+    count=0
+    with ThreadPoolExecutor(max(1,jobs)) as pool:
+        for frame in range(len(frameIndex)):
+            if frameIndex.count(frame)==0:
+                if not cap.grab():  # decoded but not converted
+                    break
+                continue
+            ret,rawIM=cap.read()
+            if not ret:
+                break
+            grayIM=cv2.cvtColor(rawIM,cv2.COLOR_BGR2GRAY)
+            for (f,trackID,x0,y0,x1,y1) in rows[frameIndex.rows(frame)]:
+                window=cropWindow(x0,y0,x1,y1,xRez,yRez,pad)
+                cropIM=grayIM[window[0]:window[1],window[2]:window[3]].copy()
+                focused=False   # z is the focus of this crop
+                if focus=='none':
+                    z=float(zMicrons)*1e-6
+                elif focus=='object':
+                    z=pool.submit(focusZ,cropIM); focused=True
+                else:
+                    if trackID not in trackZ:   # focused on the first object of the track, later ones wait for it
+                        z=pool.submit(focusZ,cropIM); focused=True
+                        trackZ[trackID]=z
+                        z.add_done_callback(lambda done,t=trackID: trackZ.__setitem__(t,float(done.result()[0])))  # drop focusIM, a long video has many tracks
+                    else:
+                        z=trackZ[trackID]
+                (xc,yc)=boxCenter(x0,y0,x1,y1)
+                pending.append(pool.submit(exportObject,cropIM,z,outDir,name,frame,xc,yc,focused))
+                while len(pending)>MAX_PENDING*max(1,jobs):
+                    pending.popleft().result()
+                    count+=1
+        while pending:
+            pending.popleft().result()
+            count+=1
+    cap.release()
+    return(count)
+
+def main(argv=None):
+    parser=argparse.ArgumentParser(description='Reconstruct every tracked object of an object file and save the images')
+    parser.add_argument('video',help='video the object file was made from')
+    parser.add_argument('objectFile',help='object file from Detect or Batch (.cols or CSV)')
+    parser.add_argument('-o','--out',help='directory for the images, default the video directory')
+    parser.add_argument('-j','--jobs',type=int,default=os.cpu_count() or 1,help='threads reconstructing and writing images')
+    parser.add_argument('--focus',choices=FOCUS_MODES,default='track',help='autofocus once per track (on its first object), per object, or none (--z)')
+    parser.add_argument('--z',type=float,default=Z_MICRONS,help='reconstruction distance in microns with --focus none')
+    parser.add_argument('--pad',type=int,default=PAD,help='pixels added on each side of an object ROI')
+    args=parser.parse_args(argv)
+    startTime=time.time()
+    count=exportVideo(args.video,args.objectFile,args.out,args.focus,args.z,args.pad,args.jobs)
+    print('Exported',count,'objects in',round(time.time()-startTime,3),'seconds')
+    return(0)
+
+if __name__=='__main__':
+    sys.exit(main())
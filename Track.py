@@ -1,4 +1,5 @@
 # Tracker
+# V4 10/18/2026 trackFrame matches all objects of a frame at once with a global (Hungarian) assignment
 # V3 9/26/2020
 # Thomas Zimmerman IBM Research-Almaden, Center for Cellular Construction (https://ccc.ucsf.edu/) 
 # This work is funded by the National Science Foundation (NSF) grant No. DBI-1548297 
@@ -6,6 +7,7 @@
 
 import numpy as np
 import math
+from scipy.optimize import linear_sum_assignment
 import Common as C # constants used by all programs
 
 nextID=1 # start ID with 1
@@ -49,6 +51,7 @@ def findID(xc,yc,area,objectArray,oiStart,oiStop,assigned):
     return(match,objID,minDistance,dArea)
 
 def trackObject(objectArray,oi,oiStart,oiStop,assigned):
+    # objectArray is a numpy array or the rows view of an ObjectTable
     global nextID # defined at top of file, only seen by this file
     objID=-1
 
@@ -75,3 +78,62 @@ def trackObject(objectArray,oi,oiStart,oiStop,assigned):
     objectArray[oi,C.TRACK_ID]=objID
 
     return(match,assigned,objectArray)
+
+def trackFrame(objectArray,frameStart,frameStop,oiStart,oiStop):
+    # Track all objects of the current frame (rows frameStart:frameStop) against the previous
+    # frame (rows oiStart:oiStop). The distance between every pair is computed at once and the
+    # pairs are chosen to minimize the total distance, instead of first come first served.
+    # Writes TRACK_ID, TRACK_DISTANCE and DELTA_AREA like trackObject, returns match code per object
+    # match: 1=good, -1 distance, -2 dArea, -3 no match found
+    global nextID
+    cur=objectArray[frameStart:frameStop]
+    n=len(cur)
+    match=np.full(n,-3)
+    if n==0:
+        return(match)
+    if cur[0,C.FRAME]==0:       # all objects start out with a unique ID
+        cur[:,C.TRACK_ID]=np.arange(nextID,nextID+n)
+        nextID+=n
+        cur[:,C.TRACK_DISTANCE]=0; cur[:,C.DELTA_AREA]=0; match[:]=1
+        return(match)
+
+    prev=objectArray[oiStart:oiStop]
+    distance=np.full(n,99999.0); dArea=np.full(n,99999.0); objID=np.zeros(n)
+    if len(prev):
+        # cost matrix, rows are current objects, columns previous objects
+        dx=cur[:,C.XC,None]-prev[None,:,C.XC]
+        dy=cur[:,C.YC,None]-prev[None,:,C.YC]
+        dist=np.sqrt(dx*dx+dy*dy)
+        prevArea=prev[:,C.AREA]
+        with np.errstate(divide='ignore',invalid='ignore'):
+            dA=np.abs((cur[:,C.AREA,None]-prevArea[None,:])/prevArea[None,:])
+        dA[:,prevArea==0]=C.MAX_DELTA_AREA+1 # matched with obj with no area so force bad match
+        good=(dist<C.MAX_MATCH_DISTANCE) & (dA<C.MAX_DELTA_AREA)
+
+        # objects without a match report their closest previous object, as trackObject does
+        nearest=np.argmin(dist,axis=1)
+        rows=np.arange(n)
+        distance=dist[rows,nearest]; dArea=dA[rows,nearest]
+        match[distance>=C.MAX_MATCH_DISTANCE]=-1
+        match[(distance<C.MAX_MATCH_DISTANCE) & (dArea>=C.MAX_DELTA_AREA)]=-2
+
+        # global assignment over the pairs that pass the distance and area tests
+        if good.any():
+            cost=np.where(good,dist,C.MAX_MATCH_DISTANCE*(n+len(prev)+1)) # larger than any sum of good distances
+            r,c=linear_sum_assignment(cost)
+            keep=good[r,c]
+            r=r[keep]; c=c[keep]
+            match[r]=1
+            objID[r]=prev[c,C.TRACK_ID]
+            distance[r]=dist[r,c]; dArea[r]=dA[r,c]
+
+    # if can't find obj in previous frame, assign a new ID
+    new=np.where(match!=1)[0]
+    objID[new]=np.arange(nextID,nextID+len(new))
+    nextID+=len(new)
+
+    # save values
+    cur[:,C.TRACK_DISTANCE]=distance
+    cur[:,C.DELTA_AREA]=dArea
+    cur[:,C.TRACK_ID]=objID
+    return(match)
@@ -1,5 +1,16 @@
 # Create composite image by selecting darkets pixel of several Z reconstructions.
 # 
+# V15 10.18.26 boxes are the contour boxes and objects touching the frame edge are kept, as before V12
+# V14 10.18.26 TILED=1 gives the same float min as TILED=0 (DarkPix.darkPixel tiled)
+# V13 10.18.26 removed unused recoFrame (reconstruction is in reco and DarkPix)
+# V12 10.18.26 detection by DarkPix (also a Detect stage, C.DETECTOR='darkPix'), min kept in float, boxes labeled with z
+#     intensities above 255 are clipped instead of wrapping as the uint8 planes of V11 and earlier did, so objects found differ from the original script
+# V11 10.18.26 TILED=1 reconstructs in overlapping tiles (reco.reconstructTiled), memory bounded by the tile size for 1 GB nodes
+# V10 10.18.26 frames decoded on a background thread (FrameSource), SKIP_FRAME frames skipped with grab() instead of decoding every frame
+# V9 10.18.26 streaming background model (Background.py) replaces the median of randomly seeked frames
+# V8 10.18.26 reconstructs in single precision, see reco.precisionCheck for agreement with float64
+# V7 10.18.26 darkest pixel composite from reco.reconstructStack, which shares one forward FFT across all z
+# V6 10.18.26 uses reco.propagate so the frequency grid and phase kernels are cached between frames
 # V5 3.30.21 removed summing with the last composite image to get higher contrast
 #
 # Thomas Zimmerman IBM Research-Almaden, Center for Cellular Construction (https://ccc.ucsf.edu/) 
@@ -8,6 +19,11 @@
 
 import cv2
 import numpy as np
+import Background as B  # streaming background estimation
+import FrameSource as FS # threaded video reader
+import reco as vc    # reconstruction, caches phase kernels for the z values used every frame
+import DarkPix as DP # darkest pixel detector
+import Common as C
 
 # put the link to your video here
 vid=r'C:\Users\ThomasZimmerman\Videos\microscope\Hologram\BrianRusk\Videos\326G.mp4'
@@ -21,6 +37,9 @@ THRESH=2 # Binary quantization threshold, lower values detects more objects
 MIN_AREA=50    # min area of object detected
 MAX_AREA=1500
 MAX_OBJ=50 # maximum objects to process
+PRECISION='single' # reconstruction precision, 'single' halves memory bandwidth, 'double' is the reference
+FFT_WORKERS=-1  # FFT threads, -1 uses all cores
+TILED=0         # 1 reconstructs in tiles of vc.TILE_SIZE reconstructed in parallel, less memory but slower, for a Raspberry Pi
 
 # other constants you should not need to change
 wvlen = 650.0e-9 # wavelength of laser. Blue is 405 nm. Red is 650
@@ -31,65 +50,27 @@ X_REZ=640; Y_REZ=480; # viewing resolution
 MIN_X=100; MIN_Y=100; # minimum full size of cropped image for reconstruction
 AGC_SETTLE=30   # skip this many frames in the beginning of video to let AGC calm down
 
-def getMedian(vid,medianFrames):
-    # Open Video
+def getBackground(vid,warmUpFrames):
+    # initialize background by reading frames in order, no seeking
     print ('openVideo:',vid)
     cap = cv2.VideoCapture(vid)
-    maxFrame = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    print('maxFrame',maxFrame)
-     
-    # Randomly select N frames
-    print('calculating median for',medianFrames,'frames')
-    frameIds = AGC_SETTLE + (maxFrame-AGC_SETTLE) * np.random.uniform(size=medianFrames)
-    frames = [] # Store selected frames in an array
-    for fid in frameIds:
-        cap.set(cv2.CAP_PROP_POS_FRAMES, fid)
-        ret, colorIM = cap.read()
-        grayIM = cv2.cvtColor(colorIM, cv2.COLOR_BGR2GRAY)    # convert color to grayscale image
-        frames.append(grayIM)
-    medianFrame = np.median(frames, axis=0).astype(dtype=np.uint8)     # Calculate the median along the time axis
-    #medianFrame=cv2.medianBlur(medianFrame,BLUR_MEDIAN)       # blur image to fill in holes to make solid object
+    for i in range(AGC_SETTLE):
+        cap.grab()
+    print('calculating background from',warmUpFrames,'frames')
+    bkgModel=B.BackgroundModel()
+    B.warmUp(cap,bkgModel,warmUpFrames)
     cap.release()
-    return(medianFrame)
-
-def recoFrame(cropIM, z):
-    complex = propagate(np.sqrt(cropIM), wvlen, z*zScale, dxy)	 #calculate wavefront at z
-    amp = np.abs(complex)**2          # output is the complex field, still need to compute intensity via abs(res)**2
-    ampInt = amp.astype('uint8')
-    return(ampInt)
-
-def propagate(input_img, wvlen, zdist, dxy):
-    M, N = input_img.shape # get image size, rows M, columns N, they must be even numbers!
-
-    # prepare grid in frequency space with origin at 0,0
-    _x1 = np.arange(0,N/2)
-    _x2 = np.arange(N/2,0,-1)
-    _y1 = np.arange(0,M/2)
-    _y2 = np.arange(M/2,0,-1)
-    _x  = np.concatenate([_x1, _x2])
-    _y  = np.concatenate([_y1, _y2])
-    x, y  = np.meshgrid(_x, _y)
-    kx,ky = x / (dxy * N), y / (dxy * M)
-    kxy2  = (kx * kx) + (ky * ky)
-
-    # compute FT at z=0
-    E0 = np.fft.fft2(np.fft.fftshift(input_img))
-
-    # compute phase aberration
-    _ph_abbr   = np.exp(-1j * np.pi * wvlen * zdist * kxy2)
-    output_img = np.fft.ifftshift(np.fft.ifft2(E0 * _ph_abbr))
-    return output_img
+    return(bkgModel)
 
 ####################### MAIN ###################
-medianFrames=20
-medianIM=getMedian(vid,medianFrames) 
+medianFrames=20 # frames used to initialize the background
+vc.setPrecision(PRECISION,FFT_WORKERS)
+bkgModel=getBackground(vid,medianFrames) 
+zList=[z*zScale for z in range(minZ, maxZ, zStep)] # reconstruction distances in meters
     
-cap = cv2.VideoCapture(vid)
-frameCount=AGC_SETTLE # skip this many frames in the beginning of video to let AGC calm down
-firstTime=1
-cap.set(cv2.CAP_PROP_POS_FRAMES, frameCount) # starting frame
+cap = FS.FrameSource(vid,AGC_SETTLE,SKIP_FRAME-1) # skip AGC_SETTLE frames in the beginning of video to let AGC calm down, then process every SKIP_FRAME frame
+frameCount=AGC_SETTLE
 while(cap.isOpened()):
-    #cap.set(cv2.CAP_PROP_POS_FRAMES, frameCount)
     # read key, test for 'q' quit
     key=cv2.waitKey(1) & 0xFF # pause 1 second (1000 msec)
     if key== ord('q'):
@@ -100,47 +81,28 @@ while(cap.isOpened()):
     if not ret: # check to make sure there was a frame to read
         print('Can not find video or we are all done')
         break
-    frameCount+=SKIP_FRAME
+    frameCount=cap.frameIndex
 
     grayIM = cv2.cvtColor(frameIM, cv2.COLOR_BGR2GRAY)    # convert color to grayscale image  
+    medianIM=bkgModel.update(grayIM)    # background adapts over long recordings
     grayIM=cv2.subtract(grayIM,medianIM)
     
-    # create composite image with darkest pixel
-    darkIM=recoFrame(grayIM, minZ)    
-    for z in range(minZ+zStep, maxZ, zStep):
-        recoIM=recoFrame(grayIM, z)
-        darkIM=np.minimum(darkIM,recoIM)
-
-    # bootstrap first time through loop
-    if firstTime:
-        lastIM=darkIM
-        firstTime=0
+    # create composite image with darkest pixel and the z it came from, one forward FFT shared by all z
+    (darkIM,zIndexIM)=DP.darkPixel(grayIM, zList, wvlen, dxy, TILED)   # TILED reconstructs in tiles, same float min
 
-    # increase constrast by summing images, only works if SKIP_FRAME ~ 1
-    #sumIM=cv2.add(darkIM,lastIM)
-    #lastIM=darkIM
-    
-    #lastIM=darkIM
+    # blur, threshold and find objects, rows in the Detect layout with C.Z_DEPTH, no features
+    # boxes are the contour boxes, not enlarged, and objects touching the frame edge are kept
     BLUR=7
-    blurIM=cv2.medianBlur(darkIM,BLUR) # blur image to fill in holes to make solid object
-  
-    # binary quantize using fixed threshold
-    ret,binaryIM = cv2.threshold(blurIM,THRESH,255,cv2.THRESH_BINARY) # threshold image to make pixels 0 or 255
+    (rowArray,binaryIM)=DP.findObjects(darkIM, zIndexIM, zList, frameCount, (), THRESH, BLUR, MIN_AREA, MAX_AREA, MAX_OBJ, False)
 
-    # draw bounding boxes around objects
-    objCount=0      # used as object ID in objectArray
+    # draw bounding boxes around objects with their depth
     color=(255,0,0) # blue boundary color
-    THICK=1         # bounding box line thickness
-    dummy,contourList, hierarchy = cv2.findContours(binaryIM, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE) # all countour points, uses more memory
-    for objContour in contourList:                  # process all objects in the contourList
-        area = int(cv2.contourArea(objContour))     # find obj area
-        PO = cv2.boundingRect(objContour)
-        x0=PO[0]; y0=PO[1]; x1=x0+PO[2]; y1=y0+PO[3]
-        THICK=3 # bounding box line thickness
-        if area>=MIN_AREA and area<MAX_AREA and objCount<MAX_OBJ: # only detect acceptable size objects
-            cv2.rectangle(frameIM, (x0,y0), (x1,y1), color, THICK) # place GREEN rectangle around each object, BGR
-            objCount+=1
-            
+    THICK=3         # bounding box line thickness
+    for row in rowArray:
+        x0=int(row[C.X0]); y0=int(row[C.Y0]); x1=int(row[C.X1]); y1=int(row[C.Y1])
+        cv2.rectangle(frameIM, (x0,y0), (x1,y1), color, THICK) # place BLUE rectangle around each object, BGR
+        cv2.putText(frameIM, str(int(round(row[C.Z_DEPTH]/zScale))), (x0,max(y0-5,10)), cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2) # z in microns
+
     #cv2.imshow('sumIM', cv2.resize(sumIM, (VGA)))      # display reduced image
     cv2.imshow('binaryIM', cv2.resize(binaryIM, (VGA)))      # display reduced image
     #cv2.imshow('recoIM', cv2.resize(darkIM, (VGA)))      # display reduced image
@@ -148,4 +110,5 @@ while(cap.isOpened()):
     #cv2.imshow('darkIM', cv2.resize(darkIM, (VGA)))      # display reduced image
     cv2.waitKey(100) 
     
+cap.release()
 cv2.destroyAllWindows()
@@ -5,6 +5,10 @@ Holgraphic Reconstruction Algorithms by Nick Antipac, UC Berkeley and  Daniel El
 This work is funded by the National Science Foundation (NSF) grant No. DBI-1548297, Center for Cellular Construction.
 Disclaimer:  Any opinions, findings and conclusions or recommendations expressed in this material are those of the authors and do not necessarily reflect the views of the National Science Foundation. 
 
+V8 10.18.26 AutoFocus z has its own result slot, a later reconstruction can't overwrite it before it is picked up
+V7 10.18.26 reconstruction runs in a RecoWorker thread so the buttons never wait, only the latest request is reconstructed and large crops show a preview first
+V6 10.18.26 frames and reconstructions come from a FrameCache, clicks that revisit a frame or only change the display don't decode or reconstruct again
+V5 10.18.26 AutoFocus button sets Z to the sharpest reconstruction of the crop
 V4 3.01.21 Removed unused buttons, added instructions, uses vc3 support function file
 V3 2.23.21 Changed Z_SCALE to be in units of 10 um 
 V1 2.09.21
@@ -15,6 +19,7 @@ Frame: Select frame to display
 Crop: Crops section of image to reconstruction, smaller makes for faster reconstruction
 Z: Change reconstruction height (distance between object and image sensor)
 Display: Change size of reconstruction display (doesn't effect reconstruction or save image size)
+AutoFocus: Searches for the Z where the cropped object is sharpest and sets Z to it
 SavePic: Saves reconstructed cropped image, image format= foo_23_100_200_300_holo.jpg and foo_23_100_200_3000_raw.jpg where:
         "foo" is from the video name
         "23" is frame number
@@ -30,16 +35,22 @@ General Use Guide
 Put your video file location in 'vid=' below.
 Use Center to find an object of interest
 Use Crop to select a cropping size that captures the object and it's fringes but not much else to speed up reconstruction time
+Use AutoFocus to find the "focus" of the object automatically, or
 Use Z+10 and Z-10 to get a coarse "focus" of the object
 Use Z+1 and Z-1 to get a fine "focus" of the object
 When you are happy with the image, click "SavePic" to save the image. The program will automatically save the raw and reconstructed images along with video name, frame number, crop location and reconstruction Z embeded in the image name.
 Use Frame to move around the frames in the movie
+Reconstruction runs in the background: clicks are never blocked, only the latest Frame/Crop/Z is reconstructed, and crops
+larger than PREVIEW_MIN_PIXELS show a blurry preview until the full resolution reconstruction is ready
 '''
 
 import tkinter as tk
 import reco as vc    # a file of functions used by this program including reconstruction
+import Focus         # automatic focus
 import cv2
 import numpy as np
+import threading
+import traceback
 
 vid=r'C:\Users\ThomasZimmerman\Videos\microscope\Hologram\ShortHoloVideo\M6.mp4' # <==== put your video location here, must be mp4, use ffmpeg to convert microscope .h264 to .mp4
 vid=r'C:\Users\ThomasZimmerman\Videos\microscope\Hologram\fewPlankton\M3.mp4'
@@ -59,6 +70,10 @@ FULL_SCALE=2            # reduce full scale image by this factor so it fits in w
 xc=1082; yc=468;        # initial center of crop window
 getCenter=False         # flag that when sets xc,y, to mouse location on click
 savePic=False           # save pic of reconstruction when flag set
+PREVIEW_SCALE=4         # preview reconstruction is this many times smaller
+PREVIEW_MIN_PIXELS=300*300  # crops with more pixels get a preview first
+POLL_MS=20              # how often (ms) the GUI checks for a finished reconstruction
+lastResult=None         # reconstruction on display
 
 # Button names. Some are left blank for future functions.
 names = [
@@ -74,7 +89,7 @@ names = [
     ("Z -1"),
     ("Z +1"),
     ("Z +10"),
-    (" "), 
+    ("AutoFocus"), 
     (" "),
     ("Display -1"),
     ("Display +1"), 
@@ -85,6 +100,80 @@ names = [
 ]
 
 ####################### PROCEDURES ##########################################
+class RecoWorker:
+    # reconstructs in a background thread so Tk callbacks return at once. Only the latest request is kept: a request
+    # still waiting when a new one arrives is dropped, and the full resolution reconstruction is skipped when a newer
+    # request is waiting after the preview. Results are picked up by the GUI thread with getResult(), which also only
+    # returns the latest one, and the AutoFocus z, which has its own slot so it isn't lost. The worker is the only
+    # user of frameCache.
+    def __init__(self, frameCache):
+        self.frameCache=frameCache
+        self.condition=threading.Condition()
+        self.request=None   # latest request not started yet
+        self.result=None    # latest result not picked up yet
+        self.bestZ=None     # latest AutoFocus z not picked up yet, kept apart from the reconstructions
+        self.thread=threading.Thread(target=self.run,daemon=True)
+        self.thread.start()
+
+    def submit(self, request):
+        # request is a dict of frame, window, z and autoFocus
+        with self.condition:
+            if self.request is not None and self.request['autoFocus']:
+                request=dict(request,autoFocus=True)   # a waiting AutoFocus isn't dropped by a later click
+            self.request=request
+            self.condition.notify()
+
+    def newerRequest(self):
+        with self.condition:
+            return(self.request is not None)
+
+    def setResult(self, result):
+        with self.condition:
+            self.result=result
+
+    def setBestZ(self, bestZ):
+        with self.condition:
+            self.bestZ=bestZ
+
+    def getResult(self):
+        # returns (bestZ,result), either is None when there is nothing new
+        with self.condition:
+            (bestZ,result)=(self.bestZ,self.result)
+            (self.bestZ,self.result)=(None,None)
+        return(bestZ,result)
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.request is None:
+                    self.condition.wait()
+                request=self.request
+                self.request=None
+            try:
+                self.process(request)
+            except Exception:
+                traceback.print_exc()   # keep the worker alive for the next request
+
+    def process(self, request):
+        (index,window,z)=(request['frame'],request['window'],request['z'])
+        grayIM=self.frameCache.gray(index)
+        if grayIM is None:
+            print('Could not read frame',index)
+            return
+        if request['autoFocus']:
+            cropIM=grayIM[window[0]:window[1],window[2]:window[3]] # crop window of image
+            (bestZ,focusIM,score)=Focus.autoFocus(cropIM)
+            self.setBestZ(bestZ)
+            return
+        pixels=(window[1]-window[0])*(window[3]-window[2])
+        if pixels>=PREVIEW_MIN_PIXELS and not self.frameCache.hasReco(index,window,z):
+            recoIM=self.frameCache.reco(index,window,z,PREVIEW_SCALE)
+            self.setResult(dict(request,grayIM=grayIM,recoIM=recoIM,preview=True))
+            if self.newerRequest():
+                return  # stale, don't spend time on full resolution
+        recoIM=self.frameCache.reco(index,window,z)
+        self.setResult(dict(request,grayIM=grayIM,recoIM=recoIM,preview=False))
+
 def doMouse(event,x,y,flags,param):
     global getCenter,xc,yc
     
@@ -141,6 +230,12 @@ def updateWindow():
     window=[y0,y1,x0,x1]
     return
 
+def autoFocus():
+    # the worker finds the best Z, showResult() then sets Z and reconstructs
+    updateWindow()
+    worker.submit({'frame':frameCount,'window':list(window),'z':Z*Z_SCALE,'autoFocus':True})
+    return
+
 def doButton():
     global frameCount,displayScale,Z,CROP,getCenter,savePic,bkgState,bkgIM
 
@@ -160,6 +255,8 @@ def doButton():
 
     if 'Center' in but:
         getCenter=True  # this flag tells doCenter to update xc,yc
+    elif 'AutoFocus' in but:
+        autoFocus()
     elif 'SavePic' in but:
         savePic=True  # flag indicates picture capture requested
     elif 'Frame' in but:
@@ -179,29 +276,49 @@ def doButton():
            CROP=1
     
     updateStatusDisplay()
-    processImage()
+    if 'Display' in but:
+        showImages()    # same reconstruction, only resized
+    elif 'AutoFocus' not in but:
+        processImage()
     return
 
 
 def processImage():
-    global savePic
-    
+    # ask the worker to reconstruct the current frame, crop and Z, showResult() displays it
     updateWindow()
-    (ret,rawIM)=vc.getFrame(cap,frameCount)
-    grayIM = cv2.cvtColor(rawIM, cv2.COLOR_BGR2GRAY)
-
-    cropIM=grayIM[window[0]:window[1],window[2]:window[3]] # crop window of image
-    recoIM=vc.recoFrame(cropIM,Z*Z_SCALE)
-    rescaleRecoIM=cv2.resize(recoIM,None,fx=displayScale,fy=displayScale)
-    rescaleFullIM=cv2.resize(grayIM,None,fx=1.0/FULL_SCALE,fy=1.0/FULL_SCALE)
+    worker.submit({'frame':frameCount,'window':list(window),'z':Z*Z_SCALE,'autoFocus':False})
+    return
 
+def showImages():
+    if lastResult is None:
+        return
+    (y0,y1,x0,x1)=lastResult['window']
+    size=(max(1,int((x1-x0)*displayScale)),max(1,int((y1-y0)*displayScale)))  # a preview is enlarged to the crop size
+    rescaleRecoIM=cv2.resize(lastResult['recoIM'],size)
+    rescaleFullIM=cv2.resize(lastResult['grayIM'],None,fx=1.0/FULL_SCALE,fy=1.0/FULL_SCALE)
     cv2.imshow('Crop Reconstructed',rescaleRecoIM)
     cv2.imshow('Full Image',rescaleFullIM)
-    cv2.waitKey(1)
+    return
 
-    if savePic==True:
-        savePicture(recoIM,cropIM) # save reconstructed and cropped raw image
-        savePic=False   # reset flag so it ony does once per mouse click
+def showResult():
+    # runs every POLL_MS in the Tk thread, displays the latest reconstruction from the worker
+    global Z,savePic,lastResult
+    (bestZ,result)=worker.getResult()
+    if result is not None:
+        lastResult=result
+        showImages()
+        current=(result['frame']==frameCount and result['window']==window and result['z']==Z*Z_SCALE)
+        if savePic and current and not result['preview']:
+            (y0,y1,x0,x1)=result['window']
+            savePicture(result['recoIM'],result['grayIM'][y0:y1,x0:x1]) # save reconstructed and cropped raw image
+            savePic=False   # reset flag so it ony does once per mouse click
+    if bestZ is not None:   # after the display, so a result saved above is checked against the Z it was made for
+        Z=max(1,int(round(bestZ/Z_SCALE)))
+        print('AutoFocus Z',Z)
+        updateStatusDisplay()
+        processImage()
+    cv2.waitKey(1)  # let OpenCV windows draw and take mouse clicks
+    root.after(POLL_MS,showResult)
     return
 
 ################################ MAIN ##################################
@@ -228,7 +345,12 @@ if goodVideo:
         tk.Radiobutton(root, text=txt,padx = 1, variable=v,width=BUTTON_WIDTH,command=doButton,indicatoron=0,value=val).grid(row=r,column=c)
 
     cap=vc.openVid(vid)
+    frameCache=vc.FrameCache(cap)
+    worker=RecoWorker(frameCache)
+    cv2.namedWindow('Crop Reconstructed')
+    cv2.namedWindow('Full Image')
     processImage()
+    showResult()
     cv2.setMouseCallback('Full Image',doMouse)
     MAX_FRAME=int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
     print ("Total frames:",MAX_FRAME)
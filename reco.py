@@ -6,50 +6,532 @@ Holgraphic Reconstruction Algorithms by Nick Antipac, UC Berkeley and  Daniel El
 This work is funded by the National Science Foundation (NSF) grant No. DBI-1548297, Center for Cellular Construction.
 Disclaimer:  Any opinions, findings and conclusions or recommendations expressed in this material are those of the authors and do not necessarily reflect the views of the National Science Foundation. 
 
+V16 10.18.26 reconstructStack raises ValueError for an empty zList
+V15 10.18.26 reconstructTiled 'minFloat','argminFloat' reduce tiles with reconstructMin, no uint8 plane per z
+V14 10.18.26 reconstructStack checks reduce before reconstructing
+V13 10.18.26 reconstructTiled tiles may have odd sizes (padCrop pads them), so odd frames are covered, tileCheck
+V12 10.18.26 reconstructMin, darkest intensity over a z sweep kept in float with no uint8 plane per z
+V11 10.18.26 reconstructTiled, full frames in overlapping tiles so memory is bounded by the tile size
+V10 10.18.26 recoFrame, reconstructStack pad crops to fast FFT sizes (PAD_MODE, APODIZE) and crop the result back
+V9 10.18.26 Reconstructor caches are thread safe, fftSize gives even 5-smooth crop sizes
+V8 10.18.26 FrameCache.reco scale gives a fast smaller preview, recoFrame takes the pixel size
+V7 10.18.26 FrameCache keeps decoded gray frames (with read-ahead) and recent reconstructions for interactive use
+V6 10.18.26 getFrame doesn't seek when reading the next frame
+V5 10.18.26 single precision mode (complex64 kernels, scipy.fft with worker threads)
+V4 10.18.26 propagate uses a Reconstructor that caches the frequency grid and phase kernel
 V3 03.01.21 removed unused background subtraction code
 V2 03.01.21 added description of program
 V1 09.24.19
 '''
 import cv2
 import numpy as np
+import zipfile
+import threading
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+try:
+    import scipy.fft as sfft    # faster than numpy.fft, keeps single precision and can use worker threads
+except ImportError:
+    sfft=None
+
+DXY   = 1.4e-6   # imager pixel (meters)
+WVLEN = 650.0e-9 # wavelength of light is red, 650 nm
+MAX_KERNELS=32   # number of phase kernels kept in the LRU cache
+MAX_KERNEL_MB=256 # memory cap of the kernel cache, a 1920x1080 kernel is 33 MB
+STACK_CHUNK_MB=128 # memory used by one batch of z planes in reconstructStack
+PRECISION='double' # 'double' (complex128) or 'single' (complex64, half the memory bandwidth)
+FFT_WORKERS=1     # threads used by scipy.fft, -1 uses all cores
+FRAME_CACHE_MB=256 # memory cap of decoded gray frames in FrameCache, a 1920x1080 frame is 2 MB
+RECO_CACHE_MB=64  # memory cap of reconstructions in FrameCache
+READ_BEHIND=1     # FrameCache also decodes this many frames before a frame that has to be sought
+READ_AHEAD=1      # and this many after it
+MAX_SKIP=10       # frames up to this far after the last one read are decoded in sequence instead of sought
+PAD_MODE='edge'   # pad crops to fftSize before reconstruction with 'edge' (repeat the border) or 'mean' values, None=off (sizes must be even)
+TILE_SIZE=512     # reconstructTiled core tile size (pixels), each tile is reconstructed with a margin around it
+TILE_NA=0.05      # numerical aperture of the fringes a tile margin holds, wvlen/(2*dxy) (0.23) keeps every fringe the pixels resolve
+TILE_FEATHER=32   # pixels over which neighbouring tiles are blended
+TILE_WORKERS=0    # tiles reconstructed at the same time (threads), 0 = number of cores
+APODIZE=0         # pixels of cosine taper to the mean at the border of the padded crop, reduces wrap-around fringes, 0=off
+
+class Reconstructor:
+    # Angular spectrum reconstruction engine. The frequency grid kxy2 only depends on the
+    # crop shape and pixel size, and the phase kernel only on (shape, wvlen, z, dxy), so both
+    # are cached and a repeated reconstruction only pays for the FFT pair and a multiply.
+    def __init__(self, precision=PRECISION, workers=FFT_WORKERS, maxKernels=MAX_KERNELS, maxKernelMB=MAX_KERNEL_MB):
+        if precision not in ('double','single'):
+            raise ValueError('precision must be double or single, not '+str(precision))
+        self.precision=precision
+        self.workers=workers
+        if precision=='single':
+            self.realType=np.float32; self.complexType=np.complex64
+        else:
+            self.realType=np.float64; self.complexType=np.complex128
+        # the float64 numpy path is the reference, scipy.fft is used for single precision or threading
+        self.useScipy=sfft is not None and (precision=='single' or workers!=1)
+        self.maxKernels=maxKernels
+        self.maxKernelBytes=maxKernelMB*1e6
+        self.kernelBytes=0          # memory used by the kernel cache
+        self.gridCache={}           # (M,N,dxy) -> kxy2
+        self.kernelCache=OrderedDict() # (M,N,wvlen,zdist,dxy) -> phase kernel, least recently used first
+        self.lock=threading.Lock()  # threads can share the engine, kernels are computed outside the lock
+
+    def getGrid(self, M, N, dxy):
+        key=(M,N,dxy)
+        kxy2=self.gridCache.get(key)
+        if kxy2 is None:
+            # prepare grid in frequency space with origin at 0,0
+            _x1 = np.arange(0,N/2)
+            _x2 = np.arange(N/2,0,-1)
+            _y1 = np.arange(0,M/2)
+            _y2 = np.arange(M/2,0,-1)
+            _x  = np.concatenate([_x1, _x2])
+            _y  = np.concatenate([_y1, _y2])
+            x, y  = np.meshgrid(_x, _y)
+            kx,ky = x / (dxy * N), y / (dxy * M)
+            kxy2  = (kx * kx) + (ky * ky)
+            kxy2.flags.writeable=False
+            self.gridCache[key]=kxy2
+        return(kxy2)
+
+    def getKernel(self, M, N, wvlen, zdist, dxy):
+        key=(M,N,wvlen,zdist,dxy)
+        with self.lock:
+            kernel=self.kernelCache.get(key)
+            if kernel is not None:
+                self.kernelCache.move_to_end(key)
+                return(kernel)
+        # compute phase aberration
+        kernel = np.exp(-1j * np.pi * wvlen * zdist * self.getGrid(M,N,dxy)) # phase computed in double, then stored at engine precision
+        kernel = kernel.astype(self.complexType,copy=False)
+        kernel.flags.writeable=False # cached kernels are shared, so protect them
+        with self.lock:
+            if key in self.kernelCache:  # another thread made it first
+                return(self.kernelCache[key])
+            self.kernelCache[key]=kernel
+            self.kernelBytes+=kernel.nbytes
+            while len(self.kernelCache)>1 and (len(self.kernelCache)>self.maxKernels or self.kernelBytes>self.maxKernelBytes):
+                oldKey,oldKernel=self.kernelCache.popitem(last=False) # evict least recently used kernel
+                self.kernelBytes-=oldKernel.nbytes
+        return(kernel)
+
+    def clear(self):
+        with self.lock:
+            self.gridCache.clear()
+            self.kernelCache.clear()
+            self.kernelBytes=0
+
+    def fft2(self, x):
+        if self.useScipy:
+            return sfft.fft2(x, workers=self.workers) # scipy uses a real-to-complex transform for real input
+        if self.precision=='single' and not np.iscomplexobj(x):
+            return fullSpectrum(np.fft.rfft2(x).astype(self.complexType,copy=False), x.shape[-1])
+        return np.fft.fft2(x)
+
+    def ifft2(self, x):
+        if self.useScipy:
+            return sfft.ifft2(x, axes=(-2,-1), workers=self.workers)
+        return np.fft.ifft2(x, axes=(-2,-1)).astype(self.complexType,copy=False)
+
+    def spectrum(self, input_img):
+        # compute FT at z=0
+        E0 = self.fft2(np.fft.fftshift(np.asarray(input_img,dtype=self.realType)))
+        return(E0)
+
+    def propagateSpectrum(self, E0, wvlen, zdist, dxy):
+        M, N = E0.shape
+        output_img = np.fft.ifftshift(self.ifft2(E0 * self.getKernel(M,N,wvlen,zdist,dxy)))
+        return output_img
+
+    def propagateStack(self, E0, wvlen, zList, dxy):
+        # propagate one spectrum to several z at once, returns complex stack (len(zList),M,N)
+        M, N = E0.shape
+        kernels=np.stack([self.getKernel(M,N,wvlen,zdist,dxy) for zdist in zList])
+        kernels*=E0                 # kernels is a fresh copy so multiply in place
+        output_img = np.fft.ifftshift(self.ifft2(kernels), axes=(-2,-1))
+        return output_img
+
+    def propagate(self, input_img, wvlen, zdist, dxy):
+        # input_img rows M, columns N, they must be even numbers! (recoFrame and reconstructStack pad with padCrop)
+        return self.propagateSpectrum(self.spectrum(input_img), wvlen, zdist, dxy)
+
+def fullSpectrum(half, N):
+    # rebuild the full FFT of a real image from its rfft2 half spectrum using F[m,n]=conj(F[-m,-n])
+    M=half.shape[0]
+    full=np.empty((M,N),dtype=half.dtype)
+    full[:,:N//2+1]=half
+    rows=(-np.arange(M))%M
+    cols=N-np.arange(N//2+1,N)
+    full[:,N//2+1:]=np.conj(half[np.ix_(rows,cols)])
+    return(full)
+
+engine=Reconstructor() # shared by propagate() and recoFrame()
+
+def setPrecision(precision, workers=FFT_WORKERS):
+    # replace the shared engine, e.g. setPrecision('single',-1) for complex64 on all cores
+    global engine
+    engine=Reconstructor(precision,workers)
+    return(engine)
+
+def fftSize(n):
+    # smallest even number >= n with no prime factors but 2, 3 and 5, the FFT is fastest on these sizes
+    size=max(2,int(n)+int(n)%2)
+    while True:
+        m=size
+        for p in (2,3,5):
+            while m%p==0:
+                m//=p
+        if m==1:
+            return(size)
+        size+=2
 
 def openVid(vid):
     cap = cv2.VideoCapture(vid)
     return(cap)
 
 def getFrame(cap,index):
-    cap.set(1,index)
+    if cap.get(cv2.CAP_PROP_POS_FRAMES)!=index: # seek only if index isn't the next frame, a seek decodes from the last keyframe
+        cap.set(cv2.CAP_PROP_POS_FRAMES,index)
     ret, rawFrame = cap.read()
     return(ret,rawFrame)
 
+class ImageCache:
+    # least recently used images (numpy arrays) with a memory cap, the most recent image is always kept
+    def __init__(self, maxMB):
+        self.maxBytes=maxMB*1e6
+        self.bytes=0
+        self.images=OrderedDict()   # key -> image, least recently used first
+
+    def __contains__(self, key):
+        return(key in self.images)
+
+    def get(self, key):
+        image=self.images.get(key)
+        if image is not None:
+            self.images.move_to_end(key)
+        return(image)
+
+    def put(self, key, image):
+        image.flags.writeable=False # cached images are shared, so protect them
+        if key in self.images:
+            self.bytes-=self.images.pop(key).nbytes
+        self.images[key]=image
+        self.bytes+=image.nbytes
+        while len(self.images)>1 and self.bytes>self.maxBytes:
+            oldKey,oldImage=self.images.popitem(last=False) # evict least recently used image
+            self.bytes-=oldImage.nbytes
+
+    def clear(self):
+        self.images.clear()
+        self.bytes=0
+
+class FrameCache:
+    # gray frames and reconstructions of a video for interactive programs. getFrame seeks when the frame isn't the
+    # next one, and a seek decodes from the last keyframe, so a frame that has to be sought is decoded along with
+    # READ_BEHIND frames before it and READ_AHEAD after it (Frame -1 and +1 are then cached), and frames up to
+    # MAX_SKIP after the last frame read are decoded in sequence (Frame +10 doesn't seek).
+    # Reconstructions are kept by (frame, window, z, scale), so changing only the display scale doesn't reconstruct again.
+    # Not thread safe, use it from one thread.
+    def __init__(self, cap, frameMB=FRAME_CACHE_MB, recoMB=RECO_CACHE_MB, readBehind=READ_BEHIND, readAhead=READ_AHEAD, maxSkip=MAX_SKIP):
+        self.cap=cap
+        self.frames=ImageCache(frameMB)  # frame index -> gray frame
+        self.recos=ImageCache(recoMB)    # (frame index, window, z) -> reconstruction
+        self.readBehind=readBehind
+        self.readAhead=readAhead
+        self.maxSkip=maxSkip
+        self.nextIndex=int(cap.get(cv2.CAP_PROP_POS_FRAMES))    # frame the next cap.read() returns
+
+    def read(self, first, last):
+        # decode frames first to last into the cache, stops at the end of the video
+        if first!=self.nextIndex:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES,first)
+        self.nextIndex=first
+        while self.nextIndex<=last:
+            ret, rawFrame = self.cap.read()
+            if not ret:
+                self.nextIndex=int(self.cap.get(cv2.CAP_PROP_POS_FRAMES))
+                break
+            if self.nextIndex not in self.frames:
+                self.frames.put(self.nextIndex,cv2.cvtColor(rawFrame, cv2.COLOR_BGR2GRAY))
+            self.nextIndex+=1
+
+    def gray(self, index):
+        # gray frame index (read only), None if it can't be read
+        grayIM=self.frames.get(index)
+        if grayIM is None:
+            if self.nextIndex<=index<=self.nextIndex+self.maxSkip:
+                self.read(self.nextIndex,index+self.readAhead)  # decoding in sequence is cheaper than a seek
+            else:
+                self.read(max(0,index-self.readBehind),index+self.readAhead)
+            grayIM=self.frames.get(index)
+        elif self.readAhead and index+1==self.nextIndex:
+            self.read(self.nextIndex,index+self.readAhead)    # stepping forward, keep the next frame ready
+        return(grayIM)
+
+    def reco(self, index, window, z, scale=1):
+        # recoFrame of the window [y0,y1,x0,x1] of frame index at z (read only), None if the frame can't be read
+        # scale>1 reconstructs the crop shrunk about scale times with the pixel size grown to match, a fast preview
+        key=(index,tuple(window),z,scale)
+        recoIM=self.recos.get(key)
+        if recoIM is None:
+            grayIM=self.gray(index)
+            if grayIM is None:
+                return(None)
+            cropIM=grayIM[window[0]:window[1],window[2]:window[3]]
+            dxy=DXY
+            if scale>1:
+                (h,w)=cropIM.shape
+                smallW=max(2,2*int(w/(2*scale))); smallH=max(2,2*int(h/(2*scale)))  # reconstruction needs even sizes
+                dxy=DXY*w/smallW
+                cropIM=cv2.resize(cropIM,(smallW,smallH),interpolation=cv2.INTER_AREA)
+            recoIM=recoFrame(cropIM,z,dxy)
+            self.recos.put(key,recoIM)
+        return(recoIM)
+
+    def hasReco(self, index, window, z, scale=1):
+        return((index,tuple(window),z,scale) in self.recos)
+
+    def clear(self):
+        # e.g. after setPrecision, which changes the reconstructions
+        self.frames.clear()
+        self.recos.clear()
+
 def propagate(input_img, wvlen, zdist, dxy):
-    M, N = input_img.shape # get image size, rows M, columns N, they must be even numbers!
-    
-    # prepare grid in frequency space with origin at 0,0
-    _x1 = np.arange(0,N/2)
-    _x2 = np.arange(N/2,0,-1)
-    _y1 = np.arange(0,M/2)
-    _y2 = np.arange(M/2,0,-1)
-    _x  = np.concatenate([_x1, _x2])
-    _y  = np.concatenate([_y1, _y2])
-    x, y  = np.meshgrid(_x, _y)
-    kx,ky = x / (dxy * N), y / (dxy * M)
-    kxy2  = (kx * kx) + (ky * ky)
-
-    # compute FT at z=0
-    E0 = np.fft.fft2(np.fft.fftshift(input_img))
-
-    # compute phase aberration 
-    _ph_abbr   = np.exp(-1j * np.pi * wvlen * zdist * kxy2)
-    output_img = np.fft.ifftshift(np.fft.ifft2(E0 * _ph_abbr))
-    return output_img
-
-def recoFrame(cropIM,z): 
-    dxy   = 1.4e-6 # imager pixel (meters)
-    wvlen = 650.0e-9 # wavelength of light is red, 650 nm
-    res = propagate(np.sqrt(cropIM), wvlen, z, dxy)	 #calculate wavefront at z
+    return engine.propagate(input_img, wvlen, zdist, dxy)
+
+def padCrop(im, mode=PAD_MODE, apodize=APODIZE):
+    # pads im to even 5-smooth sizes (fftSize), an FFT of a size with a large prime factor is several times slower
+    # returns (paddedIM, back) where paddedIM[back] is im, so a reconstruction of paddedIM can be cropped back
+    (h,w)=im.shape
+    if mode is None or mode=='none':
+        (H,W)=(h,w)
+    else:
+        (H,W)=(fftSize(h),fftSize(w))
+    (top,left)=((H-h)//2,(W-w)//2)
+    back=(slice(top,top+h),slice(left,left+w))
+    if (H,W)!=(h,w):
+        padding=((top,H-h-top),(left,W-w-left))
+        if mode=='edge':
+            im=np.pad(im,padding,mode='edge')
+        elif mode=='mean':
+            im=np.pad(im,padding,mode='constant',constant_values=im.mean())
+        else:
+            raise ValueError('unknown pad mode '+str(mode))
+    if apodize>0:
+        im=apodizeIM(im,apodize)
+    return(im,back)
+
+def apodizeIM(im, width):
+    # blends the outer width pixels of im to its mean with a raised cosine, so the FFT sees no edge where the image wraps
+    mean=im.mean()
+    window=[]
+    for n in im.shape:
+        w=np.ones(n)
+        taper=min(int(width),n//2)
+        ramp=0.5-0.5*np.cos(np.pi*(np.arange(taper)+0.5)/taper)
+        w[:taper]=ramp; w[n-taper:]=ramp[::-1]
+        window.append(w)
+    return(mean+(im-mean)*np.outer(window[0],window[1]))
+
+def recoFrame(cropIM,z,dxy=DXY,pad=PAD_MODE,apodize=APODIZE): 
+    (amplitude,back)=padCrop(np.sqrt(cropIM),pad,apodize)   # any crop size, reconstructed at the next fast FFT size
+    res = propagate(amplitude, WVLEN, z, dxy)[back]	 #calculate wavefront at z
     amp=np.abs(res)**2          # output is the complex field, still need to compute intensity via abs(res)**2
     ampInt=amp.astype('uint8')  
     return(ampInt)
 
 
+def stackChunk(M,N):
+    # number of z planes per batch so a batch (kernels, FFT output, intensity) stays under STACK_CHUNK_MB
+    complexBytes=np.dtype(engine.complexType).itemsize
+    planeBytes=M*N*(2*complexBytes+complexBytes//2)
+    return(max(1,int(STACK_CHUNK_MB*1e6/planeBytes)))
+
+def reconstructStack(frame, zList, reduce=None, wvlen=WVLEN, dxy=DXY, chunk=0, pad=PAD_MODE, apodize=APODIZE):
+    # Reconstruct frame at every z in zList (meters) sharing one forward FFT, padded like recoFrame.
+    # reduce=None returns the uint8 stack (len(zList),M,N)
+    # reduce='min' or 'max' returns the darkest or brightest pixel over all z without keeping every plane
+    # reduce='argmin' or 'argmax' returns (image,index) where index is the position in zList that produced each pixel
+    if reduce not in (None,'min','max','argmin','argmax'):
+        raise ValueError('unknown reduce '+str(reduce))
+    if len(zList)==0:
+        raise ValueError('reconstructStack needs at least one z')
+    (amplitude,back)=padCrop(np.sqrt(frame),pad,apodize)
+    E0=engine.spectrum(amplitude)
+    if chunk<=0:
+        chunk=stackChunk(*E0.shape)
+    M, N = frame.shape[:2]
+    if reduce is None:
+        stackIM=np.empty((len(zList),M,N),dtype='uint8')
+    bestIM=None; indexIM=None
+    for start in range(0,len(zList),chunk):
+        res=engine.propagateStack(E0, wvlen, zList[start:start+chunk], dxy)[:,back[0],back[1]]
+        amp=np.abs(res)**2          # output is the complex field, still need to compute intensity via abs(res)**2
+        ampInt=amp.astype('uint8')
+        if reduce is None:
+            stackIM[start:start+len(ampInt)]=ampInt
+            continue
+        for i in range(len(ampInt)):
+            if bestIM is None:
+                bestIM=ampInt[i].copy()
+                indexIM=np.zeros((M,N),dtype='int32')
+            elif reduce in ('min','argmin'):
+                better=ampInt[i]<bestIM
+                np.minimum(bestIM,ampInt[i],out=bestIM)
+                indexIM[better]=start+i
+            else:   # 'max' or 'argmax'
+                better=ampInt[i]>bestIM
+                np.maximum(bestIM,ampInt[i],out=bestIM)
+                indexIM[better]=start+i
+    if reduce is None:
+        return(stackIM)
+    if reduce in ('argmin','argmax'):
+        return(bestIM,indexIM)
+    return(bestIM)
+
+def reconstructMin(frame, zList, wvlen=WVLEN, dxy=DXY, chunk=0, pad=PAD_MODE, apodize=APODIZE):
+    # darkest intensity of each pixel over every z in zList and the position in zList where it was darkest,
+    # returns (minIM,indexIM) with minIM in the engine's real type. Each plane is reduced into minIM in place as it
+    # comes out of the FFT, only the complex batch and two plane buffers are allocated.
+    (amplitude,back)=padCrop(np.sqrt(frame),pad,apodize)
+    E0=engine.spectrum(amplitude)
+    if chunk<=0:
+        chunk=stackChunk(*E0.shape)
+    M, N = frame.shape[:2]
+    minIM=np.full((M,N),np.inf,dtype=engine.realType)
+    indexIM=np.zeros((M,N),dtype='int32')
+    ampIM=np.empty((M,N),dtype=engine.realType)
+    darker=np.empty((M,N),dtype='bool')
+    for start in range(0,len(zList),chunk):
+        res=engine.propagateStack(E0, wvlen, zList[start:start+chunk], dxy)
+        for i in range(len(res)):
+            np.abs(res[i][back],out=ampIM)
+            np.square(ampIM,out=ampIM)     # intensity
+            np.less(ampIM,minIM,out=darker)
+            np.copyto(minIM,ampIM,where=darker)
+            np.copyto(indexIM,start+i,where=darker)
+    return(minIM,indexIM)
+
+def tileMargin(z, wvlen=WVLEN, dxy=DXY, na=TILE_NA):
+    # pixels light from a point spreads sideways over distance z for fringes up to numerical aperture na
+    na=min(na,wvlen/(2*dxy))    # finer fringes are beyond the pixel pitch
+    return(int(math.ceil(abs(z)*math.tan(math.asin(na))/dxy)))
+
+def tileRamp(n, start, end, feather):
+    # blend weight along one axis of the tile whose core is start:end, ramps of width feather centered on the core
+    # edges sum to 1 with the ramps of the neighbouring tiles, no ramp at the frame edge
+    w=np.ones(n,dtype='float32')
+    x=np.arange(n)+0.5
+    if start>0 and feather>0:
+        w*=np.clip((x-(start-feather/2))/feather,0,1)
+    if end<n and feather>0:
+        w*=np.clip(((end+feather/2)-x)/feather,0,1)
+    return(w)
+
+def reconstructTiled(frame, zList, reduce='min', wvlen=WVLEN, dxy=DXY, tile=TILE_SIZE, na=TILE_NA, feather=TILE_FEATHER, workers=TILE_WORKERS):
+    # Reconstruct a full frame in overlapping tiles, peak memory is set by the tile size and workers instead of the frame.
+    # Each tile is a core of tile x tile pixels plus a margin of tileMargin(max z) for the fringes of objects near its
+    # edge, reconstructed by reconstructStack, and tiles are blended over feather pixels.
+    # zList a number returns the uint8 reconstruction at that z (as recoFrame), a list returns reduce ('min', 'max',
+    # 'argmin', 'argmax') over all z as reconstructStack. argmin and argmax indexes are taken from the tile core, not blended.
+    # 'minFloat' and 'argminFloat' reduce each tile with reconstructMin and return the darkest intensity in float like
+    # reconstructMin (no uint8 plane per z, values above 255 are not wrapped), the caller clips it once.
+    single=np.isscalar(zList)
+    if single:
+        (zList,reduce)=([zList],'min')
+    if reduce not in ('min','max','argmin','argmax','minFloat','argminFloat'):
+        raise ValueError('reconstructTiled reduce must be min, max, argmin, argmax, minFloat or argminFloat, not '+str(reduce))
+    floatMin=reduce in ('minFloat','argminFloat')
+    (H,W)=frame.shape[:2]
+    margin=tileMargin(max(abs(z) for z in zList),wvlen,dxy,na)+int(math.ceil(feather/2))
+    (tileH,tileW)=(min(fftSize(tile+2*margin),H),min(fftSize(tile+2*margin),W))  # every tile the same size shares kernels, padCrop pads odd sizes
+    tasks=[]
+    for y0 in range(0,H,tile):
+        for x0 in range(0,W,tile):
+            (y1,x1)=(min(y0+tile,H),min(x0+tile,W))
+            ty0=min(max(y0-(tileH-(y1-y0))//2,0),H-tileH); tx0=min(max(x0-(tileW-(x1-x0))//2,0),W-tileW)   # tile window inside the frame
+            tasks.append(((y0,y1,x0,x1),(ty0,ty0+tileH,tx0,tx0+tileW)))
+
+    if workers<=0:
+        workers=os.cpu_count() or 1
+    workers=min(workers,len(tasks))
+    chunk=max(1,stackChunk(fftSize(tileH),fftSize(tileW))//workers)    # tiles in flight share STACK_CHUNK_MB
+
+    def reconstructTile(task):
+        (core,window)=task
+        tileIM=frame[window[0]:window[1],window[2]:window[3]]
+        if floatMin:
+            return(reconstructMin(tileIM,zList,wvlen,dxy,chunk))
+        return(reconstructStack(tileIM,zList,reduce,wvlen,dxy,chunk))
+
+    outIM=np.zeros((H,W),dtype=engine.realType if floatMin else 'float32')
+    indexIM=np.zeros((H,W),dtype='int32') if reduce in ('argmin','argmax','argminFloat') else None
+    with ThreadPoolExecutor(workers) as pool:
+        for (core,window),result in zip(tasks,pool.map(reconstructTile,tasks)):
+            (y0,y1,x0,x1)=core; (ty0,ty1,tx0,tx1)=window
+            if floatMin or indexIM is not None:
+                (result,index)=result
+            if indexIM is not None:
+                indexIM[y0:y1,x0:x1]=index[y0-ty0:y1-ty0,x0-tx0:x1-tx0]
+            weight=np.outer(tileRamp(H,y0,y1,feather)[ty0:ty1],tileRamp(W,x0,x1,feather)[tx0:tx1])  # zero outside core+feather/2
+            outIM[ty0:ty1,tx0:tx1]+=weight*result
+    if not floatMin:
+        outIM=np.rint(outIM).astype('uint8')
+    if indexIM is not None:
+        return(outIM,indexIM)
+    return(outIM)
+
+def tileCheck(shapes=((300,400),(301,401),(544,961)), zList=(4000e-6,5000e-6,6000e-6), tile=128):
+    # test that reconstructTiled equals reconstructStack when the margin holds every fringe (na=1) and that small tiles
+    # cover the frame, even and odd frame sizes, returns the number of cases that differ (float reduces within rounding)
+    rng=np.random.default_rng(0)
+    failed=0
+    for shape in shapes:
+        frame=rng.integers(0,120,shape).astype('uint8')
+        for reduce in ('min','argmin','argminFloat'):
+            tiled=reconstructTiled(frame,list(zList),reduce,tile=tile,na=1)
+            if reduce=='argminFloat':
+                full=reconstructMin(frame,list(zList))
+            else:
+                full=reconstructStack(frame,list(zList),reduce)
+            if reduce=='min':
+                (tiled,full)=((tiled,),(full,))
+            same=all(np.allclose(a,b,rtol=1e-5) for a,b in zip(tiled,full))
+            print('tileCheck',shape,reduce,'same' if same else 'DIFFERENT')
+            failed+=not same
+        # many tiles: a flat frame reconstructs to itself, so a pixel no tile covers or blend weights that don't sum to 1 show
+        flat=np.full(shape,100,dtype='uint8')
+        same=np.array_equal(reconstructTiled(flat,list(zList),'min',tile=tile,na=0.01),reconstructStack(flat,list(zList),'min'))
+        print('tileCheck',shape,'flat, tiles of',tile,'same' if same else 'DIFFERENT')
+        failed+=not same
+        same=np.allclose(reconstructTiled(flat,list(zList),'minFloat',tile=tile,na=0.01),reconstructMin(flat,list(zList))[0],rtol=1e-5)
+        print('tileCheck',shape,'flat minFloat, tiles of',tile,'same' if same else 'DIFFERENT')
+        failed+=not same
+    return(failed)
+
+def precisionCheck(zipName='goldHolo.zip', precision='single', workers=FFT_WORKERS):
+    # compare reconstructions at the requested precision with the float64 reference on every
+    # image in zipName. z (microns) is taken from the image name, e.g. alg_120_3585.jpg is z=3585
+    # returns (images, max pixel difference, fraction of pixels that differ)
+    reference=Reconstructor('double',1)
+    test=Reconstructor(precision,workers)
+    maxDiff=0; diffPix=0; totalPix=0; images=0
+    with zipfile.ZipFile(zipName) as zf:
+        for name in zf.namelist():
+            if not name.lower().endswith('.jpg'):
+                continue
+            rawIM=cv2.imdecode(np.frombuffer(zf.read(name),dtype='uint8'),cv2.IMREAD_GRAYSCALE)
+            rawIM=rawIM[:rawIM.shape[0]//2*2,:rawIM.shape[1]//2*2] # FFT grid needs even sizes
+            z=float(name[:-4].split('_')[-1])*1e-6
+            recoIM=[]
+            for e in (reference,test):
+                res=e.propagate(np.sqrt(rawIM), WVLEN, z, DXY)
+                recoIM.append((np.abs(res)**2).astype('uint8'))
+            diff=np.abs(recoIM[0].astype('int')-recoIM[1].astype('int'))
+            maxDiff=max(maxDiff,int(diff.max()))
+            diffPix+=np.count_nonzero(diff)
+            totalPix+=diff.size
+            images+=1
+    print('precisionCheck',precision,'images',images,'max difference',maxDiff,'pixels that differ',round(diffPix/max(totalPix,1),5))
+    return(images,maxDiff,diffPix/max(totalPix,1))